@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+
+import pygame
+
+# --- РЕСУРСЫ ---
+# Картинки грузятся и масштабируются в фоновом потоке, пока идёт заставка. Пятнадцать значков рангов
+# упакованы в один атлас (столбец RANK_SIZE), значок — subsurface атласа. Отмасштабированные заставка
+# и атлас кэшируются на диске вместе с манифестом (mtime и размер исходников), так что следующие
+# запуски читают две маленькие PNG вместо декодирования и smoothscale оригиналов.
+# convert()/convert_alpha() требуют окна, поэтому делаются в главном потоке при первом обращении.
+
+RANK_SIZE = (120, 35)
+RANK_NAMES = [f"{tier}{i}" for tier in ("bronze", "silver", "gold") for i in range(1, 6)]
+CACHE_VERSION = 1
+
+
+class AssetManager:
+    def __init__(self, base_dir, splash_width, cache_dir=None):
+        self.base_dir = base_dir
+        self.splash_width = int(splash_width)
+        self.cache_dir = cache_dir or os.path.join(base_dir, "assets", "cache")
+        self.ready = threading.Event()
+        self.thread = None
+        # Результат фонового потока (ещё без convert) и готовые для отрисовки поверхности
+        self.splash_src = self.atlas_src = None
+        self.rank_rects = {}
+        self._splash = self._ranks = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._load, daemon=True)
+        self.thread.start()
+
+    def splash(self):
+        # None — ещё грузится; False — картинки нет или она не читается
+        if not self.ready.is_set(): return None
+        if self._splash is None: self._splash = self.splash_src.convert() if self.splash_src else False
+        return self._splash
+
+    def rank(self, name):
+        self.ready.wait()
+        if self._ranks is None:
+            atlas = self.atlas_src.convert_alpha() if self.atlas_src else None
+            self._ranks = {n: atlas.subsurface(r) for n, r in self.rank_rects.items()} if atlas else {}
+        return self._ranks.get(os.path.splitext(name)[0].lower())
+
+    def _sources(self):
+        # Имена рангов сравниваются без учёта регистра: на диске лежит Bronze3.png
+        out = {}
+        ranks_dir = os.path.join(self.base_dir, "assets", "images", "ranks")
+        try: files = {os.path.splitext(f)[0].lower(): os.path.join(ranks_dir, f) for f in os.listdir(ranks_dir)}
+        except OSError: files = {}
+        for name in RANK_NAMES:
+            if name in files: out[name] = files[name]
+        splash = os.path.join(self.base_dir, "assets", "images", "intro", "GDA.jpeg")
+        if os.path.exists(splash): out["splash"] = splash
+        return out
+
+    def _manifest(self, sources):
+        stamps = {}
+        for key, path in sources.items():
+            st = os.stat(path); stamps[key] = [os.path.relpath(path, self.base_dir), st.st_mtime_ns, st.st_size]
+        return {"version": CACHE_VERSION, "splash_width": self.splash_width, "rank_size": list(RANK_SIZE), "sources": stamps}
+
+    def _load(self):
+        try:
+            sources = self._sources()
+            manifest = self._manifest(sources)
+            if not self._load_cache(manifest):
+                self._build(sources)
+                self._save_cache(manifest)
+        except (OSError, pygame.error, ValueError): pass  # без картинок: заставка и ранги рисуются текстом
+        finally: self.ready.set()
+
+    def _build(self, sources):
+        if "splash" in sources:
+            try:
+                img = pygame.image.load(sources["splash"])
+                h = int(img.get_height() * self.splash_width / img.get_width())
+                self.splash_src = pygame.transform.smoothscale(img, (self.splash_width, h))
+            except (pygame.error, ValueError): self.splash_src = None
+        w, h = RANK_SIZE
+        atlas = pygame.Surface((w, h * len(RANK_NAMES)), pygame.SRCALPHA, 32)
+        for i, name in enumerate(RANK_NAMES):
+            if name not in sources: continue
+            try: img = pygame.transform.smoothscale(pygame.image.load(sources[name]), RANK_SIZE)
+            except (pygame.error, ValueError): continue
+            rect = pygame.Rect(0, i * h, w, h)
+            if not img.get_flags() & pygame.SRCALPHA: atlas.fill((0, 0, 0, 255), rect)
+            # Сложение с прозрачным нулём копирует пиксели вместе с альфой, без смешивания
+            atlas.blit(img, rect, special_flags=pygame.BLEND_RGBA_ADD)
+            self.rank_rects[name] = rect
+        self.atlas_src = atlas
+
+    def _cache_path(self, name): return os.path.join(self.cache_dir, name)
+
+    def _load_cache(self, manifest):
+        try:
+            with open(self._cache_path("manifest.json")) as f: saved = json.load(f)
+        except (OSError, ValueError): return False
+        if {k: v for k, v in saved.items() if k not in ("ranks", "has_splash")} != manifest: return False
+        try:
+            self.splash_src = pygame.image.load(self._cache_path("splash.png")) if saved.get("has_splash") else None
+            self.atlas_src = pygame.image.load(self._cache_path("ranks.png"))
+        except (pygame.error, FileNotFoundError):
+            self.splash_src = self.atlas_src = None; return False
+        self.rank_rects = {name: pygame.Rect(rect) for name, rect in saved.get("ranks", {}).items()}
+        return True
+
+    def _save_cache(self, manifest):
+        # Каждый файл пишется во временный и подменяется os.replace; манифест — последним
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            images = [("ranks.png", self.atlas_src)] + ([("splash.png", self.splash_src)] if self.splash_src else [])
+            for name, surf in images:
+                tmp = self._cache_path("tmp_" + name)
+                pygame.image.save(surf, tmp); os.replace(tmp, self._cache_path(name))
+            saved = dict(manifest, ranks={n: list(r) for n, r in self.rank_rects.items()}, has_splash=bool(self.splash_src))
+            tmp = self._cache_path("manifest.json.tmp")
+            with open(tmp, "w") as f: json.dump(saved, f)
+            os.replace(tmp, self._cache_path("manifest.json"))
+        except (OSError, pygame.error): pass  # кэш — только ускорение
@@ -0,0 +1,52 @@
+import numpy as np
+
+from board import Board, CHECK_NONE, CHECK_CORRECT, CHECK_WRONG
+
+# --- ПАКЕТНАЯ ПРОВЕРКА ---
+# Доски — массивы uint8 формы (n, n) или пачкой (N, n, n); Board превращается в массив без копии
+# (np.frombuffer поверх его bytearray). Все проверки — операции над целыми массивами, без циклов по клеткам.
+# Решение можно передать одно на всю пачку (n, n): оно растягивается по N.
+
+
+def as_array(boards):
+    # Board, список Board / списков строк или готовый массив -> uint8 (..., n, n)
+    if isinstance(boards, np.ndarray): return boards.astype(np.uint8, copy=False)
+    if isinstance(boards, Board): return np.frombuffer(boards.cells, np.uint8).reshape(boards.size, boards.size)
+    if boards and isinstance(boards[0], Board): return np.stack([as_array(b) for b in boards])
+    return np.asarray(boards, np.uint8)
+
+
+def units(boards, bw, bh):
+    # (N, 3n, n): строки, столбцы, блоки каждой доски
+    a = as_array(boards)
+    if a.ndim == 2: a = a[None]
+    N, n, _ = a.shape
+    boxes = a.reshape(N, n // bh, bh, n // bw, bw).transpose(0, 1, 3, 2, 4).reshape(N, n, n)
+    return np.concatenate((a, a.transpose(0, 2, 1), boxes), axis=1)
+
+
+def cell_status(boards, solutions):
+    # CHECK_NONE для пустых клеток, CHECK_CORRECT / CHECK_WRONG для заполненных — как во флагах validation_grid
+    a, s = as_array(boards), as_array(solutions)
+    return np.where(a == 0, CHECK_NONE, np.where(a == s, CHECK_CORRECT, CHECK_WRONG)).astype(np.uint8)
+
+
+def is_valid(boards, bw, bh):
+    # Каждая строка, столбец и блок — перестановка 1..n (доска заполнена и без повторов)
+    u = np.sort(units(boards, bw, bh), axis=2)
+    return (u == np.arange(1, u.shape[2] + 1, dtype=np.uint8)).all(axis=(1, 2))
+
+
+def is_solved(boards, solutions): return (as_array(boards) == as_array(solutions)).all(axis=(-2, -1))
+
+
+def check_batch(boards, bw, bh, solutions=None):
+    # По доске: заполнено клеток, valid; с решениями ещё неверных клеток и solved
+    a = as_array(boards)
+    if a.ndim == 2: a = a[None]
+    out = {"filled": np.count_nonzero(a, axis=(1, 2)), "valid": is_valid(a, bw, bh)}
+    if solutions is not None:
+        s = as_array(solutions)
+        out["wrong"] = np.count_nonzero((a != s) & (a != 0), axis=(1, 2))
+        out["solved"] = is_solved(a, s)
+    return out
@@ -0,0 +1,72 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from sudoku_engine import MODE_GEOMETRY, SYMMETRIES, difficulty_fill
+from logic_solver import difficulty_band, generate_rated
+from puzzle_bank import BankWriter
+
+# --- ПАКЕТНАЯ ГЕНЕРАЦИЯ ---
+# Без pygame и без окна: python batch_generate.py -m 9x9 -d Hard -n 10000 -o hard9.jsonl
+# Результаты пишутся по мере готовности (JSON Lines или банк, см. puzzle_bank.py). Прерванный прогон
+# (Ctrl+C, ошибка воркера) не теряет готовое: файл закрывается, а банк собирается из того, что успело прийти.
+
+def _job(args):
+    size, bw, bh, fill, band, symmetry = args
+    return generate_rated(size, bw, bh, fill, band, symmetry=symmetry)
+
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(description="Generate Sudoku puzzles on all CPU cores without opening a window.")
+    p.add_argument("-m", "--mode", choices=sorted(MODE_GEOMETRY), default="9x9")
+    p.add_argument("-d", "--difficulty", default="Norm", help="Easy/Norm/Adv/Hard/Exp or a fill fraction, e.g. 0.3")
+    p.add_argument("-n", "--count", type=int, default=100)
+    p.add_argument("-o", "--output", required=True)
+    p.add_argument("-f", "--format", choices=["jsonl", "bank"], help="default: bank for *.bin, otherwise jsonl")
+    p.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--symmetry", choices=SYMMETRIES, default="none")
+    p.add_argument("-a", "--append", action="store_true", help="keep existing records/sections in the output file")
+    return p.parse_args(argv)
+
+
+def run(mode, fill, count, output, fmt, workers, symmetry="none", append=False, progress=sys.stderr):
+    geometry = MODE_GEOMETRY[mode]
+    tasks = [(*geometry, fill, difficulty_band(mode, fill), symmetry)] * count
+    chunk = 1 if geometry[0] > 9 else 8
+    if fmt == "bank": sink = BankWriter(output, append)
+    else: sink = open(output, "a" if append else "w")
+    done = 0; t0 = last = time.perf_counter()
+    try:
+        with multiprocessing.Pool(workers) as pool:
+            for puzzle, solution in pool.imap_unordered(_job, tasks, chunksize=chunk):
+                if fmt == "bank": sink.add(mode, fill, geometry, puzzle, solution)
+                else: sink.write(json.dumps({"mode": mode, "fill": fill, "puzzle": puzzle.to_rows(), "solution": solution.to_rows()}) + "\n")
+                done += 1
+                now = time.perf_counter()
+                if now - last > 0.5 or done == count:
+                    last = now
+                    if fmt != "bank": sink.flush()
+                    if progress: progress.write(f"\r{done}/{count}  {done / (now - t0):.1f} puzzles/s"); progress.flush()
+    finally:
+        sink.close()
+        if progress and done < count: progress.write(f"\nstopped: {done}/{count} puzzles written to {output}\n")
+    elapsed = time.perf_counter() - t0
+    if progress: progress.write(f"\n{count} puzzles in {elapsed:.2f}s ({count / elapsed:.1f} puzzles/s, {workers} workers)\n")
+    return elapsed
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try: fill = difficulty_fill(args.mode, args.difficulty)
+    except ValueError:
+        print(f"unknown difficulty: {args.difficulty}", file=sys.stderr); return 2
+    fmt = args.format or ("bank" if args.output.endswith(".bin") else "jsonl")
+    run(args.mode, fill, args.count, args.output, fmt, max(1, args.workers), args.symmetry, args.append)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
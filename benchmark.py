@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+# Без окна: SDL рисует в память
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import sudoku
+import logic_solver
+from puzzle_seeds import PuzzleCache
+from sudoku_engine import MODE_GEOMETRY, Constraints, difficulty_fill
+try: import batch_check
+except ImportError: batch_check = None
+
+# --- БЕНЧМАРКИ ---
+# python benchmark.py -o bench.json            — замер всех режимов
+# python benchmark.py --compare old.json new.json — сравнение двух прогонов по медиане
+
+def percentiles(samples_ns):
+    s = sorted(samples_ns); n = len(s)
+    pick = lambda q: s[min(n - 1, int(q * n))] / 1e6
+    return {"n": n, "mean_ms": sum(s) / n / 1e6, "min_ms": s[0] / 1e6, "p50_ms": pick(0.5),
+            "p90_ms": pick(0.9), "p99_ms": pick(0.99), "max_ms": s[-1] / 1e6}
+
+
+def measure(fn, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup: setup()
+        t = time.perf_counter_ns(); fn(); samples.append(time.perf_counter_ns() - t)
+    return percentiles(samples)
+
+
+# Пакетная проверка: BATCH досок игроков — решение с пропусками и ошибками, часть досок решена
+BATCH = 1000
+
+def batch_boards(solution, count, seed):
+    rng = random.Random(seed); n = solution.size; out = []
+    for k in range(count):
+        b = solution.copy()
+        for _ in range(rng.randrange(4) if k % 2 else 0):
+            b.set(rng.randrange(n), rng.randrange(n), rng.randrange(n + 1))
+        out.append(b)
+    return out
+
+
+def check_batch_loop(boards, solution, size, bw, bh):
+    # То же, что batch_check.check_batch, но циклами по клеткам, как проверялась доска до NumPy
+    out = []
+    for b in boards:
+        filled = wrong = 0
+        for v, s in zip(b.cells, solution.cells):
+            if v: filled += 1; wrong += v != s
+        cons = Constraints(b, size, bw, bh)
+        valid = all(cons.counts[u][d] == 1 for u in range(3 * size) for d in range(1, size + 1))
+        out.append((filled, valid, wrong, filled == size * size and not wrong))
+    return out
+
+
+def bench_mode(mode, difficulty, seed, repeat):
+    size = MODE_GEOMETRY[mode][0]
+    small = max(3, repeat // (10 if size > 9 else 1))
+    fill = difficulty_fill(mode, difficulty)
+    random.seed(seed)
+    sudoku.set_mode_parameters(mode, fill)
+    sudoku.begin_game(sudoku.generate_puzzle())
+    puzzle = sudoku.initial_grid.copy()
+    empties = [(r, c) for r in range(size) for c in range(size) if puzzle[r][c] == 0]
+    res = {}
+
+    def solve(solver):
+        random.seed(seed); sudoku.solve_algo(puzzle.copy(), solver)
+    res["solve_algo[dlx]"] = measure(lambda: solve("dlx"), small)
+    # Старый перебор на 16x16 уходит в минуты — сравниваем его только на малых досках
+    if size <= 9: res["solve_algo[backtrack]"] = measure(lambda: solve("backtrack"), small)
+    seeds = iter(range(seed, seed + small))
+    res["generate_puzzle"] = measure(sudoku.generate_puzzle, small, lambda: random.seed(next(seeds)))
+    # Кэш по seed: промах — генерация, попадание — копия готовых досок
+    cache = PuzzleCache(); seeds = iter(range(seed, seed + small))
+    res["puzzle_cache[miss]"] = measure(lambda: cache.get(mode, fill, next(seeds)), small)
+    res["puzzle_cache[hit]"] = measure(lambda: cache.get(mode, fill, seed), repeat)
+    res["rate[logic]"] = measure(lambda: logic_solver.rate(puzzle, *MODE_GEOMETRY[mode]), repeat)
+    res["get_candidates[all empty]"] = measure(lambda: [sudoku.get_candidates(sudoku.grid, r, c) for r, c in empties], repeat)
+    res["toggle_check[on+off]"] = measure(lambda: (sudoku.toggle_check(), sudoku.toggle_check()), repeat)
+    # Клик: клетка + кнопка панели по сетке точек экрана (раскладка уже посчитана)
+    layout = sudoku.game_layout(); points = [(x, y) for x in range(0, sudoku.WIDTH, 9) for y in range(0, sudoku.HEIGHT, 9)]
+    res[f"hit_test[{len(points)} clicks]"] = measure(lambda: [(layout.cell_at(x, y), layout.key_at(x, y)) for x, y in points], repeat)
+    res["check_victory_condition"] = measure(sudoku.check_victory_condition, repeat)
+    if batch_check:
+        _, bw, bh = MODE_GEOMETRY[mode]; solution = sudoku.solved_grid
+        boards = batch_boards(solution, BATCH, seed); arr = batch_check.as_array(boards)
+        res[f"check_batch[loop, N={BATCH}]"] = measure(lambda: check_batch_loop(boards, solution, size, bw, bh), 3)
+        res[f"check_batch[numpy, N={BATCH}]"] = measure(lambda: batch_check.check_batch(arr, bw, bh, solution), small)
+    for notes in (False, True):
+        sudoku.is_notes_mode = notes
+        res[f"draw_game_screen[notes={'on' if notes else 'off'}]"] = measure(sudoku.draw_game_screen, max(3, repeat // 5))
+        # Полная перерисовка (смена темы, возврат из паузы) против обычного кадра со слоями
+        res[f"draw_game_screen[full, notes={'on' if notes else 'off'}]"] = measure(
+            sudoku.draw_game_screen, max(3, repeat // 5), sudoku.game_layers.invalidate)
+    sudoku.is_notes_mode = False
+    return res
+
+
+# Холодный старт: каждый замер — свежий интерпретатор, время по этапам печатается последней строкой
+COLD_START = """
+import time; t0 = time.perf_counter()
+import sudoku_engine; t1 = time.perf_counter()
+import sudoku; t2 = time.perf_counter()
+sudoku.init_ui(); t3 = time.perf_counter()
+sudoku.draw_main_menu(); sudoku.pygame.display.flip(); t4 = time.perf_counter()
+print(t1 - t0, t2 - t1, t3 - t2, t4 - t3)
+"""
+COLD_STAGES = ["import sudoku_engine", "import sudoku", "init_ui", "first frame"]
+
+def cold_start(repeat):
+    samples = {name: [] for name in COLD_STAGES + ["process total"]}
+    here = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(repeat):
+        t = time.perf_counter_ns()
+        out = subprocess.run([sys.executable, "-c", COLD_START], cwd=here, capture_output=True, text=True, check=True).stdout
+        samples["process total"].append(time.perf_counter_ns() - t)
+        for name, sec in zip(COLD_STAGES, out.strip().splitlines()[-1].split()): samples[name].append(int(float(sec) * 1e9))
+    return {name: percentiles(v) for name, v in samples.items()}
+
+
+def run(modes, difficulty, seed, repeat, cold_repeat=5):
+    sudoku.init_ui()
+    out = {"meta": {"seed": seed, "repeat": repeat, "difficulty": difficulty, "python": platform.python_version(),
+                    "pygame": pygame.version.ver, "platform": platform.platform(),
+                    "video_driver": os.environ.get("SDL_VIDEODRIVER"), "time": time.strftime("%Y-%m-%d %H:%M:%S")},
+           "results": {}}
+    if cold_repeat:
+        out["results"]["cold_start"] = cold_start(cold_repeat)
+        for name, r in out["results"]["cold_start"].items():
+            print(f"{'cold':>6} {name:<34} p50 {r['p50_ms']:9.3f} ms  p90 {r['p90_ms']:9.3f} ms  (n={r['n']})")
+    for mode in modes:
+        out["results"][mode] = bench_mode(mode, difficulty, seed, repeat)
+        for name, r in out["results"][mode].items():
+            print(f"{mode:>6} {name:<34} p50 {r['p50_ms']:9.3f} ms  p90 {r['p90_ms']:9.3f} ms  (n={r['n']})")
+    return out
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f: old = json.load(f)["results"]
+    with open(new_path) as f: new = json.load(f)["results"]
+    for mode in new:
+        for name, r in new[mode].items():
+            o = old.get(mode, {}).get(name)
+            if not o: continue
+            ratio = r["p50_ms"] / o["p50_ms"] if o["p50_ms"] else float("inf")
+            print(f"{mode:>6} {name:<34} {o['p50_ms']:9.3f} -> {r['p50_ms']:9.3f} ms  x{ratio:.2f}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Seeded headless benchmarks for the solver, generator and renderer.")
+    p.add_argument("-m", "--modes", nargs="+", choices=list(MODE_GEOMETRY), default=list(MODE_GEOMETRY))
+    p.add_argument("-d", "--difficulty", default="Hard", help="Easy/Norm/Adv/Hard/Exp or a fill fraction")
+    p.add_argument("-s", "--seed", type=int, default=12345)
+    p.add_argument("-r", "--repeat", type=int, default=50)
+    p.add_argument("-o", "--output", help="write results as JSON")
+    p.add_argument("--cold-start", type=int, default=5, metavar="N", help="fresh-process startup runs (0 to skip)")
+    p.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two result files instead of running")
+    args = p.parse_args(argv)
+    if args.compare: compare(*args.compare); return 0
+    out = run(args.modes, args.difficulty, args.seed, args.repeat, args.cold_start)
+    if args.output:
+        with open(args.output, "w") as f: json.dump(out, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+from itertools import chain
+
+# --- ДОСКА ---
+# Клетки лежат в одном bytearray (size*size байт, по строкам) вместо списка списков int: доска 9x9 — 81 байт,
+# копия — копирование буфера. board[r] — изменяемое окно (memoryview) на строку, поэтому старый код
+# с board[r][c] работает без изменений; col(c) — окно с шагом size, box(b) — значения блока.
+# Окна смотрят в общий буфер: копировать доску нужно через copy(), а не board[r][:].
+
+# Флаги проверки для доски validation_grid (по байту на клетку)
+CHECK_NONE, CHECK_CORRECT, CHECK_WRONG = 0, 1, 2
+
+
+class Board:
+    __slots__ = ("size", "bw", "bh", "cells", "view")
+
+    def __init__(self, size, bw, bh, cells=None):
+        self.size, self.bw, self.bh = size, bw, bh
+        self.cells = bytearray(size * size) if cells is None else bytearray(cells)
+        self.view = memoryview(self.cells)
+
+    @classmethod
+    def from_rows(cls, rows, bw, bh):
+        if isinstance(rows, Board): return rows
+        return cls(len(rows), bw, bh, chain.from_iterable(rows))
+
+    def __reduce__(self): return Board, (self.size, self.bw, self.bh, bytes(self.cells))
+
+    def __len__(self): return self.size
+
+    def __getitem__(self, r):
+        n = self.size
+        if not 0 <= r < n: raise IndexError(r)
+        return self.view[r * n:(r + 1) * n]
+
+    def __iter__(self):
+        n = self.size; v = self.view
+        for i in range(0, n * n, n): yield v[i:i + n]
+
+    def __eq__(self, other): return isinstance(other, Board) and self.size == other.size and self.cells == other.cells
+
+    __hash__ = None
+
+    def get(self, r, c): return self.cells[r * self.size + c]
+
+    def set(self, r, c, v): self.cells[r * self.size + c] = v
+
+    def row(self, r): return self[r]
+
+    def col(self, c): return self.view[c::self.size]
+
+    def box(self, b):
+        n, bw, bh = self.size, self.bw, self.bh
+        r0, c0 = b // (n // bw) * bh, b % (n // bw) * bw
+        return [self.cells[(r0 + i) * n + c0 + j] for i in range(bh) for j in range(bw)]
+
+    def copy(self): return Board(self.size, self.bw, self.bh, self.cells)
+
+    def clear(self): self.cells[:] = bytes(len(self.cells))
+
+    def count(self, v): return self.cells.count(v)
+
+    def to_rows(self):
+        n = self.size
+        return [list(self.cells[i:i + n]) for i in range(0, n * n, n)]
@@ -0,0 +1,126 @@
+import argparse
+import sqlite3
+import sys
+import time
+
+from puzzle_bank import difficulty_key
+
+# --- ИСТОРИЯ ИГР ---
+# SQLite: каждая законченная партия — строка в games. Индекс (mode, difficulty, won, time_ms) даёт лучшее время
+# одним спуском по B-дереву; сумма и число партий по секции лежат в totals и обновляются в той же транзакции,
+# так что среднее считается за O(1). Перцентили — по гистограмме побед с шагом HIST_MS (time_hist):
+# OFFSET по индексу прошёл бы k записей (10+ мс на 300k партий), а корзин в секции не больше тысяч.
+# Точность перцентиля — одна корзина (секунда), как и в выводе mm:ss.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    mode TEXT NOT NULL,
+    difficulty INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    time_ms INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    lives_lost INTEGER NOT NULL,
+    hints INTEGER NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_time ON games (mode, difficulty, won, time_ms);
+CREATE TABLE IF NOT EXISTS totals (
+    mode TEXT NOT NULL,
+    difficulty INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    win_time_ms INTEGER NOT NULL,
+    PRIMARY KEY (mode, difficulty)
+);
+CREATE TABLE IF NOT EXISTS time_hist (
+    mode TEXT NOT NULL,
+    difficulty INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    PRIMARY KEY (mode, difficulty, bucket)
+);
+"""
+HIST_MS = 1000
+
+
+class GameHistory:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        if self.db.execute("SELECT 1 FROM time_hist LIMIT 1").fetchone() is None:
+            # База из версии без гистограммы: заполняем по уже записанным победам один раз
+            with self.db:
+                self.db.execute("INSERT INTO time_hist SELECT mode, difficulty, time_ms / ?, COUNT(*) FROM games "
+                                "WHERE won = 1 GROUP BY mode, difficulty, time_ms / ?", (HIST_MS, HIST_MS))
+
+    def record(self, mode, fill_percent, won, time_ms, score, lives_lost, hints, finished_at=None):
+        diff = difficulty_key(fill_percent); won = int(bool(won))
+        with self.db:
+            self.db.execute("INSERT INTO games (mode, difficulty, won, time_ms, score, lives_lost, hints, finished_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (mode, diff, won, time_ms, score, lives_lost, hints, finished_at or time.time()))
+            self.db.execute("INSERT INTO totals VALUES (?, ?, 1, ?, ?) ON CONFLICT (mode, difficulty) DO UPDATE SET "
+                            "games = games + 1, wins = wins + excluded.wins, win_time_ms = win_time_ms + excluded.win_time_ms",
+                            (mode, diff, won, time_ms if won else 0))
+            if won:
+                self.db.execute("INSERT INTO time_hist VALUES (?, ?, ?, 1) ON CONFLICT (mode, difficulty, bucket) DO UPDATE SET "
+                                "wins = wins + 1", (mode, diff, time_ms // HIST_MS))
+
+    def totals(self, mode, fill_percent):
+        row = self.db.execute("SELECT games, wins, win_time_ms FROM totals WHERE mode = ? AND difficulty = ?",
+                              (mode, difficulty_key(fill_percent))).fetchone()
+        return row or (0, 0, 0)
+
+    def best_time(self, mode, fill_percent):
+        # MIN по префиксу индекса — один спуск по B-дереву
+        return self.db.execute("SELECT MIN(time_ms) FROM games WHERE mode = ? AND difficulty = ? AND won = 1",
+                               (mode, difficulty_key(fill_percent))).fetchone()[0]
+
+    def average_time(self, mode, fill_percent):
+        _, wins, total = self.totals(mode, fill_percent)
+        return total / wins if wins else None
+
+    def percentile_time(self, mode, fill_percent, q):
+        # Ближайший ранг: корзина, в которую попадает k-я по порядку победа (начало корзины, мс)
+        wins = self.totals(mode, fill_percent)[1]
+        if not wins: return None
+        k = min(wins - 1, max(0, int(q * wins)))
+        seen = 0
+        for bucket, n in self.db.execute("SELECT bucket, wins FROM time_hist WHERE mode = ? AND difficulty = ? ORDER BY bucket",
+                                         (mode, difficulty_key(fill_percent))):
+            seen += n
+            if seen > k: return bucket * HIST_MS
+        return None
+
+    def summary(self, mode, fill_percent):
+        games, wins, _ = self.totals(mode, fill_percent)
+        return {"games": games, "wins": wins, "best_ms": self.best_time(mode, fill_percent),
+                "avg_ms": self.average_time(mode, fill_percent),
+                "p50_ms": self.percentile_time(mode, fill_percent, 0.5),
+                "p90_ms": self.percentile_time(mode, fill_percent, 0.9)}
+
+    def sections(self):
+        return [(mode, diff / 1000) for mode, diff in self.db.execute("SELECT mode, difficulty FROM totals ORDER BY mode, difficulty")]
+
+    def close(self): self.db.close()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Print per-mode statistics from the game history database.")
+    p.add_argument("path", nargs="?", default="sudoku_history.db")
+    args = p.parse_args(argv)
+    history = GameHistory(args.path)
+    fmt = lambda ms: "--:--" if ms is None else f"{int(ms) // 60000:02}:{int(ms) // 1000 % 60:02}"
+    for mode, fill in history.sections():
+        s = history.summary(mode, fill)
+        print(f"{mode:>6} fill {fill:.2f}  games {s['games']:6}  wins {s['wins']:6}  best {fmt(s['best_ms'])}"
+              f"  avg {fmt(s['avg_ms'])}  p50 {fmt(s['p50_ms'])}  p90 {fmt(s['p90_ms'])}")
+    history.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
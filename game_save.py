@@ -0,0 +1,75 @@
+import os
+import struct
+
+from puzzle_bank import pack_record, unpack_record, record_size, difficulty_key
+
+# --- СОХРАНЕНИЕ ПАРТИИ ---
+# Заголовок (режим, сложность, геометрия, seed, упакованные подсказки и решение — как в банке) пишется один раз
+# при старте партии, атомарно. Дальше файл только дописывается записями фиксированного размера:
+# ход ("M", запись журнала ходов), отмена ("U"), возврат ("R") или снимок состояния ("S").
+# В каждой записи — текущие очки, жизни и время, так что возобновление — это заголовок + проход по записям.
+# Оборванная последняя запись (падение посреди write) при чтении просто отбрасывается.
+
+MAGIC = b"SDKS"
+VERSION = 2
+HEADER_V1 = struct.Struct("<4sH8sHBBB")  # magic, version, режим, сложность*1000, size, bw, bh
+HEADER = struct.Struct("<4sH8sHBBBq")    # то же + seed (-1 — без seed); заголовок версии 1 читается как без seed
+RECORD = struct.Struct("<cIiBI")        # вид, ход, очки, жизни, время (мс)
+
+
+class GameSave:
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.available = os.path.exists(path)
+
+    def start(self, mode, fill_percent, geometry, puzzle, solution, seed=None):
+        self.close()
+        size, bw, bh = geometry
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, mode.encode()[:8], difficulty_key(fill_percent), size, bw, bh,
+                                -1 if seed is None else seed))
+            f.write(pack_record(puzzle, solution, size))
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.reopen()
+
+    def reopen(self):
+        # Продолжаем дописывать существующий файл (после загрузки)
+        self.close()
+        self.file = open(self.path, "ab")
+        self.available = True
+
+    def append(self, kind, move, score, lives, elapsed_ms):
+        if not self.file: return
+        self.file.write(RECORD.pack(kind, move, score, lives, elapsed_ms))
+        self.file.flush(); os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file: self.file.close()
+        self.file = None
+
+    def discard(self):
+        # Партия закончена: продолжать нечего
+        self.close()
+        try: os.remove(self.path)
+        except OSError: pass
+        self.available = False
+
+    def load(self):
+        # dict с заголовком и списком записей или None, если файла нет или он повреждён
+        try:
+            with open(self.path, "rb") as f: data = f.read()
+            magic, version, mode, diff, size, bw, bh = HEADER_V1.unpack_from(data, 0)
+            if magic != MAGIC or version not in (1, VERSION): return None
+            head = HEADER_V1 if version == 1 else HEADER
+            seed = head.unpack_from(data, 0)[7] if version == VERSION else -1
+        except (OSError, struct.error): return None
+        start = head.size + record_size(size)
+        if len(data) < start: return None
+        puzzle, solution = unpack_record(data[head.size:start], size)
+        n = (len(data) - start) // RECORD.size
+        return {"mode": mode.rstrip(b"\0").decode(), "fill": diff / 1000, "geometry": (size, bw, bh),
+                "seed": None if seed < 0 else seed, "puzzle": puzzle, "solution": solution,
+                "records": [RECORD.unpack_from(data, start + i * RECORD.size) for i in range(n)]}
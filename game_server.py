@@ -0,0 +1,191 @@
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from sudoku_engine import MODE_GEOMETRY, LARGE_SIZE, difficulty_fill, fill_range
+from logic_solver import next_hint
+from puzzle_bank import difficulty_key
+from puzzle_seeds import SEED_BITS, PuzzleCache, generate_seeded, new_seed, daily_seed, parse_puzzle_code
+from game_session import GameSession
+
+# --- СЕРВЕР ПАРТИЙ ---
+# python game_server.py [--host 127.0.0.1] [--port 8765] | [--unix /tmp/sudoku.sock]
+# Протокол — по одному JSON-объекту на строку в обе стороны. Запрос {"id": 1, "op": "...", ...},
+# ответ {"id": 1, "ok": true, ...} или {"id": 1, "ok": false, "error": "..."}. Операции:
+#   new    {mode, difficulty, seed?} | {code} | {mode, difficulty, daily: true} -> полное состояние партии
+#   place  {session, r, c, value} -> correct;  erase {session, r, c};  undo / redo {session}
+#   check  {session} -> errors;  hint {session} -> cell, value, text
+#   state  {session} -> полное состояние;  close {session};  stats -> счётчики сервера и кэша головоломок
+# Ответы на ходы несут статус партии (очки, жизни, заполнено, результат). Партии принадлежат соединению
+# и закрываются вместе с ним; запросы одного соединения выполняются по порядку.
+# Генерация — в пуле процессов. Одна и та же головоломка (гонка по коду, ежедневная) генерируется
+# один раз: сначала кэш, потом ожидание уже запущенной задачи с тем же ключом. Там же ищутся подсказки
+# на досках от LARGE_SIZE: логический поиск по 25x25 и 36x36 не должен держать остальные соединения.
+# Упавший воркер ломает весь пул: пул пересоздаётся, а задача повторяется один раз. Любая другая ошибка
+# запроса — ответ с ok: false, соединение остаётся открытым.
+
+PORT = 8765
+MAX_LINE = 1 << 16
+
+
+class GameServer:
+    def __init__(self, workers=None):
+        self.workers = workers or max(1, min(4, (multiprocessing.cpu_count() or 2) - 1))
+        self.executor = None
+        self.cache = PuzzleCache()
+        self.pending = {}
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.connections = self.moves = self.requests = self.joined = self.restarts = 0
+        self.started = time.monotonic()
+
+    async def listen(self, host="127.0.0.1", port=PORT, unix=None):
+        # Не fork, как в puzzle_pool: воркеры запускаются по первой задаче, когда сокеты клиентов уже открыты,
+        # и унаследованная копия не дала бы закрыть соединение. forkserver порождает их из чистого процесса
+        self._start_executor()
+        if unix: return await asyncio.start_unix_server(self.handle, unix, limit=MAX_LINE)
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_LINE)
+
+    def _start_executor(self):
+        ctx = multiprocessing.get_context("forkserver") if sys.platform.startswith("linux") else None
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+
+    def shutdown(self):
+        if self.executor: self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+
+    async def run_job(self, fn, *args):
+        # Сломанный пул пересоздаёт первая заметившая задача; остальные сразу повторяют в новом
+        loop, executor = asyncio.get_running_loop(), self.executor
+        try: return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            if self.executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True); self._start_executor(); self.restarts += 1
+            return await loop.run_in_executor(self.executor, fn, *args)
+
+    # --- ГОЛОВОЛОМКИ ---
+    async def puzzle(self, mode, fill_percent, seed):
+        # Уже генерируется — ждём ту же задачу (в статистике кэша это не промах, а joined)
+        key = (mode, difficulty_key(fill_percent), seed)
+        fut = self.pending.get(key)
+        if fut is not None: self.joined += 1
+        else:
+            found = self.cache.lookup(mode, fill_percent, seed)
+            if found: return found
+            fut = self.pending[key] = asyncio.ensure_future(self.run_job(generate_seeded, mode, fill_percent, seed))
+            fut.add_done_callback(lambda f: self._generated(key, mode, fill_percent, seed, f))
+        # shield: отключившийся клиент не отменяет генерацию для остальных ожидающих
+        puzzle = await asyncio.shield(fut)
+        return tuple(b.copy() for b in puzzle)
+
+    def _generated(self, key, mode, fill_percent, seed, fut):
+        del self.pending[key]
+        if not fut.cancelled() and fut.exception() is None: self.cache.put(mode, fill_percent, seed, fut.result())
+
+    # --- СОЕДИНЕНИЕ ---
+    async def handle(self, reader, writer):
+        self.connections += 1; owned = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                writer.write(json.dumps(await self.request(line, owned)).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError): pass   # обрыв или строка длиннее MAX_LINE
+        finally:
+            for sid in owned: self.sessions.pop(sid, None)
+            self.connections -= 1
+            writer.close()
+
+    async def request(self, line, owned):
+        self.requests += 1; rid = None
+        try:
+            req = json.loads(line)
+            if not isinstance(req, dict): raise ValueError("request must be a JSON object")
+            rid = req.get("id")
+            out = await self.dispatch(req, owned)
+        except KeyError as e: return {"id": rid, "ok": False, "error": f"missing field: {e.args[0]}"}
+        except (ValueError, TypeError) as e: return {"id": rid, "ok": False, "error": str(e)}
+        except Exception as e: return {"id": rid, "ok": False, "error": f"{type(e).__name__}: {e}"}
+        out.update(id=rid, ok=True)
+        return out
+
+    async def dispatch(self, req, owned):
+        op = req["op"]
+        if op == "new": return await self.new_game(req, owned)
+        if op == "stats": return self.stats()
+        sid = req["session"]
+        s = self.sessions.get(sid) if sid in owned else None
+        if s is None: raise ValueError(f"unknown session: {sid}")
+        if op == "place":
+            out = {"correct": s.place(int(req["r"]), int(req["c"]), int(req["value"]))}; self.moves += 1
+        elif op == "erase": s.erase(int(req["r"]), int(req["c"])); out = {}; self.moves += 1
+        elif op == "check": out = {"errors": s.check()}
+        elif op == "hint":
+            if s.size >= LARGE_SIZE:
+                found = await self.run_job(next_hint, s.hint_board(), s.size, s.grid.bw, s.grid.bh)
+                (r, c), v, text = s.apply_hint(found)
+            else: (r, c), v, text = s.hint()
+            out = {"cell": [r, c], "value": v, "text": text}; self.moves += 1
+        elif op == "undo": out = {"done": s.undo()}
+        elif op == "redo": out = {"done": s.redo()}
+        elif op == "state": return s.state()
+        elif op == "close": owned.discard(sid); del self.sessions[sid]; return {}
+        else: raise ValueError(f"unknown op: {op}")
+        out.update(s.status())
+        return out
+
+    async def new_game(self, req, owned):
+        if "code" in req: mode, fill, seed = parse_puzzle_code(str(req["code"]))
+        else:
+            mode = req.get("mode", "9x9")
+            if mode not in MODE_GEOMETRY: raise ValueError(f"unknown mode: {mode}")
+            fill = difficulty_fill(mode, req.get("difficulty", "Norm"))
+            lo, hi = fill_range(mode)
+            if not lo <= fill <= hi: raise ValueError(f"difficulty out of range for {mode}: {fill}")
+            if req.get("daily"): seed = daily_seed()
+            elif req.get("seed") is not None:
+                seed = int(req["seed"])
+                if not 0 <= seed < 1 << SEED_BITS: raise ValueError(f"seed out of range: {seed}")
+            else: seed = new_seed()
+        sid = next(self.ids)
+        s = self.sessions[sid] = GameSession(sid, mode, fill, seed, await self.puzzle(mode, fill, seed))
+        owned.add(sid)
+        return s.state()
+
+    def stats(self):
+        up = time.monotonic() - self.started
+        return {"sessions": len(self.sessions), "connections": self.connections, "requests": self.requests,
+                "moves": self.moves, "uptime_s": up, "moves_per_s": self.moves / up if up else 0.0,
+                "generating": len(self.pending), "joined": self.joined, "pool_restarts": self.restarts, "cache": self.cache.stats()}
+
+
+async def serve(host, port, unix, workers):
+    server = GameServer(workers)
+    listener = await server.listen(host, port, unix)
+    print(f"Sudoku server on {unix or f'{host}:{port}'}", flush=True)
+    try:
+        async with listener: await listener.serve_forever()
+    finally: server.shutdown()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Multi-session Sudoku server (line-delimited JSON over a local socket).")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    p.add_argument("-w", "--workers", type=int, help="puzzle generation processes")
+    args = p.parse_args(argv)
+    try: asyncio.run(serve(args.host, args.port, args.unix, args.workers))
+    except KeyboardInterrupt: pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
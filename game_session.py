@@ -0,0 +1,158 @@
+import random
+import time
+
+from sudoku_engine import BoardState, MODE_GEOMETRY, placement_points, time_bonus
+from logic_solver import next_hint
+from move_journal import MoveJournal, FLAG_HINT, FLAG_ERROR
+from board import Board, CHECK_NONE, CHECK_CORRECT, CHECK_WRONG
+from puzzle_seeds import puzzle_code
+try: from batch_check import cell_status
+except ImportError: cell_status = None
+
+# --- ПАРТИЯ БЕЗ ОКНА ---
+# Состояние одной партии (доска, жизни, очки, журнал, клетки с подсказками и ошибками) и правила ходов,
+# проверки и подсказок — без глобальных переменных и pygame. Одни и те же правила для окна (sudoku.py держит
+# одну партию и рисует её доски) и для сервера, где в одном процессе живёт сколько угодно партий (game_server.py).
+# Ошибочный вызов (клетка вне доски, подсказка, партия окончена) — ValueError с текстом для клиента.
+# Очки за скорость считаются от выбора клетки (окно передаёт thinking_s), а без него — от предыдущего хода.
+# on_move(вид, ход) получает каждую запись журнала ("M"), отмену ("U") и возврат ("R") — для автосохранения;
+# вызывается в конце хода, когда очки, жизни и итог партии уже обновлены.
+
+LIVES = 3
+
+
+class GameSession:
+    def __init__(self, sid, mode, fill_percent, seed, puzzle, clock=time.monotonic, on_move=None):
+        self.sid, self.mode, self.fill, self.seed = sid, mode, fill_percent, seed
+        self.size, bw, bh = MODE_GEOMETRY[mode]
+        self.initial, self.solution = (Board.from_rows(b, bw, bh) for b in puzzle)
+        self.grid = self.initial.copy()
+        self.cons = BoardState(self.grid, self.size, bw, bh, self.solution)
+        self.validation = Board(self.size, bw, bh)
+        self.lives, self.score = LIVES, 0
+        self.active, self.check_mode, self.result = True, False, None
+        self.hinted, self.errors, self.scored = set(), set(), set()
+        self.journal = MoveJournal()
+        self.clock, self.on_move = clock, on_move
+        self.started = self.last_move = clock(); self.finished = None; self.bonus = 0
+
+    def elapsed_ms(self): return int(((self.finished or self.clock()) - self.started) * 1000)
+
+    def _cell(self, r, c):
+        if not (0 <= r < self.size and 0 <= c < self.size): raise ValueError(f"cell out of range: {r},{c}")
+        if not self.active: raise ValueError("game is over")
+
+    def _set(self, r, c, val, flags=0):
+        # True, если ход записан в журнал (повтор той же цифры — не ход)
+        if self.grid.get(r, c) == val: return False
+        self.journal.record(r * self.size + c, self.grid.get(r, c), val, flags)
+        self.cons.set(r, c, val); self.validation.set(r, c, CHECK_NONE)
+        return True
+
+    def _moved(self, kind=b"M"):
+        if not self.on_move: return
+        if kind == b"M": self.on_move(kind, self.journal.moves[self.journal.pos - 1])
+        else: self.on_move(kind)
+
+    def _finish(self, result):
+        self.active, self.result, self.finished = False, result, self.clock()
+        if result == "won": self.bonus = time_bonus(self.score, self.elapsed_ms()); self.score += self.bonus
+
+    # --- ХОДЫ ---
+    def place(self, r, c, val, thinking_s=None):
+        # True, если цифра верная; неверная остаётся на доске и штрафует только проверка
+        self._cell(r, c)
+        if not 1 <= val <= self.size: raise ValueError(f"value out of range: {val}")
+        if self.initial.get(r, c): raise ValueError("cell is a given")
+        correct = val == self.solution.get(r, c)
+        moved = self._set(r, c, val, 0 if correct else FLAG_ERROR)
+        now = self.clock()
+        if correct:
+            if (r, c) not in self.scored:
+                self.scored.add((r, c))
+                self.score += placement_points((r, c) in self.hinted, (r, c) in self.errors,
+                                               now - self.last_move if thinking_s is None else thinking_s)
+            if self.cons.is_solved(): self._finish("won")
+        else: self.errors.add((r, c))
+        self.last_move = now
+        if moved: self._moved()
+        return correct
+
+    def erase(self, r, c):
+        self._cell(r, c)
+        if not self.initial.get(r, c) and self._set(r, c, 0): self._moved()
+
+    def check(self):
+        # Переключает режим проверки; при включении каждая неверная цифра стоит жизнь. Возвращает число ошибок
+        if self.check_mode:
+            self.check_mode = False; self.validation.clear(); return 0
+        if not self.active: raise ValueError("game is over")
+        flags = self.validation.cells
+        if cell_status:
+            flags[:] = cell_status(self.grid, self.solution).tobytes(); errs = flags.count(CHECK_WRONG)
+        else:
+            errs = 0
+            for i, (v, s) in enumerate(zip(self.grid.cells, self.solution.cells)):
+                if v:
+                    if v != s: flags[i] = CHECK_WRONG; errs += 1
+                    else: flags[i] = CHECK_CORRECT
+        self.check_mode = True
+        if errs:
+            self.lives = max(0, self.lives - errs)
+            if not self.lives: self._finish("lost")
+        return errs
+
+    def hint(self):
+        # ((r, c), значение, пояснение): следующий логический ход по доске без ошибок или случайная пустая клетка
+        return self.apply_hint(next_hint(self.hint_board(), self.size, self.grid.bw, self.grid.bh))
+
+    def hint_board(self):
+        # Доска без ошибочных цифр, по которой ищется подсказка (сервер ищет её на больших досках в пуле процессов)
+        if not self.active: raise ValueError("game is over")
+        return Board(self.size, self.grid.bw, self.grid.bh, (v if v == s else 0 for v, s in zip(self.grid.cells, self.solution.cells)))
+
+    def apply_hint(self, found):
+        # found — результат next_hint по hint_board() или None (тогда случайная пустая клетка)
+        if not self.active: raise ValueError("game is over")
+        if found: (r, c), _, text = found
+        elif self.cons.empty_cells: (r, c), text = random.choice(self.cons.empty_cells), ""
+        else: raise ValueError("no empty cells")
+        return self.reveal(r, c, text)
+
+    def reveal(self, r, c, text=""):
+        # Решение в клетку с пометкой "подсказка" (в окне — и супер-подсказка по выбранной клетке)
+        self._cell(r, c)
+        v = self.solution.get(r, c)
+        moved = self._set(r, c, v, FLAG_HINT); self.hinted.add((r, c))
+        if self.cons.is_solved(): self._finish("won")
+        if moved: self._moved()
+        return (r, c), v, text
+
+    def undo(self):
+        if not self.active: raise ValueError("game is over")
+        move = self.journal.undo()
+        if move:
+            r, c = divmod(move[0], self.size); self.cons.set(r, c, move[1]); self.validation.set(r, c, CHECK_NONE)
+            self._moved(b"U")
+        return move is not None
+
+    def redo(self):
+        if not self.active: raise ValueError("game is over")
+        move = self.journal.redo()
+        if move:
+            r, c = divmod(move[0], self.size); self.cons.set(r, c, move[2]); self.validation.set(r, c, CHECK_NONE)
+            if self.cons.is_solved(): self._finish("won")
+            self._moved(b"R")
+        return move is not None
+
+    # --- СОСТОЯНИЕ ---
+    def status(self):
+        return {"session": self.sid, "lives": self.lives, "score": self.score, "filled": self.cons.filled,
+                "active": self.active, "result": self.result, "elapsed_ms": self.elapsed_ms()}
+
+    def state(self):
+        out = self.status()
+        out.update({"mode": self.mode, "fill": self.fill, "size": self.size,
+                    "code": puzzle_code(self.mode, self.fill, self.seed) if self.seed is not None else None,
+                    "givens": self.initial.to_rows(), "grid": self.grid.to_rows(), "moves": len(self.journal)})
+        return out
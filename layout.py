@@ -0,0 +1,65 @@
+# --- РАСКЛАДКА ИГРОВОГО ЭКРАНА ---
+# Все прямоугольники игрового экрана (x, y, w, h) считаются один раз на ключ (ширина окна, высота, размер доски),
+# а не на каждое событие мыши и кадр. Попадание в клетку или в кнопку цифровой панели — деление,
+# без перебора прямоугольников, поэтому на 36x36 клик стоит столько же, сколько на 6x6.
+# Сверху вниз: HUD, доска, ряд инструментов, цифровая панель (не больше 9 цифр в ряду), строка сообщения,
+# Check / Menu. Доска упирается в ширину окна; если окно для неё слишком низкое — в высоту, и тогда центруется.
+
+MARGIN = 10
+HUD_H = 100
+TOOL_GAP = 15        # доска -> ряд инструментов
+PAD_GAP = 60         # ряд инструментов -> цифровая панель
+FOOTER = 110         # под панелью: сообщение и кнопки Check / Menu
+PAD_BOTTOM = 80      # ниже этой границы (от низа окна) клик уже не в панель
+KEY_GAP = 5
+KEY_MAX_H = 60
+KEY_MIN_H = 30
+TOOL_W, TOOL_H, TOOL_STEP = 60, 50, 70
+
+
+class Layout:
+    def __init__(self, width, height, size):
+        self.key = (width, height, size)
+        self.width, self.height, self.size = width, height, size
+        # Цифровая панель: ряды делятся поровну (16 -> 2x8, 36 -> 4x9)
+        self.rows = -(-size // 9)
+        self.cols = -(-size // self.rows)
+        by_w = (width - 2 * MARGIN) // size
+        by_h = (height - HUD_H - TOOL_GAP - PAD_GAP - FOOTER - self.rows * (KEY_MIN_H + KEY_GAP)) // size
+        cs = self.cell_s = max(1, min(by_w, by_h))
+        self.side = cs * size
+        self.grid_x = MARGIN if cs == by_w else (width - self.side) // 2
+        self.grid_y = HUD_H
+        self.tool_y = self.grid_y + self.side + TOOL_GAP
+        self.pad_y = self.tool_y + PAD_GAP
+        self.key_w = (width - 2 * MARGIN) // self.cols
+        self.key_h = min(KEY_MAX_H, (height - FOOTER - self.pad_y) // self.rows - KEY_GAP)
+        cx = width // 2
+        self.tools = [(cx - 130 + i * TOOL_STEP, self.tool_y, TOOL_W, TOOL_H) for i in range(4)]
+        self.check = (width - 130, height - 70, 110, 50)
+        self.menu = (20, height - 70, 110, 50)
+        self.message_y = height - FOOTER
+
+    def cell_at(self, x, y):
+        # (r, c) клетки под точкой или None
+        cs = self.cell_s
+        c, r = (x - self.grid_x) // cs, (y - self.grid_y) // cs
+        if 0 <= r < self.size and 0 <= c < self.size: return r, c
+        return None
+
+    def key_at(self, x, y):
+        # Цифра кнопки панели под точкой (промежуток под рядом относится к нему) или 0
+        if not self.pad_y <= y < self.height - PAD_BOTTOM or x < MARGIN: return 0
+        col = (x - MARGIN) // self.key_w
+        if col >= self.cols: return 0
+        d = (y - self.pad_y) // (self.key_h + KEY_GAP) * self.cols + col + 1
+        return d if d <= self.size else 0
+
+    def cell_rect(self, r, c):
+        cs = self.cell_s
+        return self.grid_x + c * cs, self.grid_y + r * cs, cs, cs
+
+    def key_rect(self, d):
+        # Видимая кнопка цифры d (по 2 px отступа с боков внутри своей колонки)
+        row, col = divmod(d - 1, self.cols)
+        return MARGIN + col * self.key_w + 2, self.pad_y + row * (self.key_h + KEY_GAP), self.key_w - 4, self.key_h
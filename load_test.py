@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from sudoku_engine import MODE_GEOMETRY, SOLVERS, DEFAULT_SOLVER
+from board import Board
+from game_server import GameServer, PORT
+
+# --- НАГРУЗОЧНЫЙ ТЕСТ СЕРВЕРА ---
+# python load_test.py -c 200 -g 3                  — 200 клиентов по 3 партии на сервер из game_server.py
+# python load_test.py --local -c 200 --race        — сервер в этом же процессе, все играют одну головоломку
+# Клиент решает свою доску сам и ставит цифры в случайном порядке, изредка ошибаясь (--mistakes),
+# как живой игрок: за ошибкой следует верная цифра поверх. В конце — партии и ходы в секунду, задержки ответов.
+
+
+def percentiles(samples_ns):
+    s = sorted(samples_ns); n = len(s)
+    if not n: return {"n": 0}
+    pick = lambda q: s[min(n - 1, int(q * n))] / 1e6
+    return {"n": n, "p50_ms": pick(0.5), "p90_ms": pick(0.9), "p99_ms": pick(0.99), "max_ms": s[-1] / 1e6}
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.next_id = 0
+
+    async def call(self, op, **fields):
+        self.next_id += 1
+        self.writer.write(json.dumps(dict(fields, id=self.next_id, op=op)).encode() + b"\n")
+        await self.writer.drain()
+        resp = json.loads(await self.reader.readline())
+        if not resp["ok"]: raise RuntimeError(f"{op}: {resp['error']}")
+        return resp
+
+
+async def play(client, new_args, mistakes, rng, lat, solutions):
+    t = time.perf_counter_ns(); state = await client.call("new", **new_args); lat["new"].append(time.perf_counter_ns() - t)
+    size, bw, bh = MODE_GEOMETRY[state["mode"]]
+    # В гонке доска одна на всех — решаем её один раз на процесс
+    key = state["code"]
+    if key not in solutions:
+        board = Board.from_rows(state["givens"], bw, bh); SOLVERS[DEFAULT_SOLVER](board, size, bw, bh)
+        solutions[key] = board
+    solution, sid = solutions[key], state["session"]
+    empties = [(r, c) for r, row in enumerate(state["grid"]) for c, v in enumerate(row) if not v]
+    rng.shuffle(empties)
+    moves = 0
+    for r, c in empties:
+        right = solution.get(r, c)
+        steps = [right]
+        if size > 1 and rng.random() < mistakes: steps.insert(0, right % size + 1)
+        for v in steps:
+            t = time.perf_counter_ns(); resp = await client.call("place", session=sid, r=r, c=c, value=v)
+            lat["move"].append(time.perf_counter_ns() - t); moves += 1
+    await client.call("close", session=sid)
+    return moves, resp["result"] if empties else "won"
+
+
+async def run_client(connect, games, new_args, mistakes, seed, lat, solutions, totals):
+    reader, writer = await connect()
+    client, rng = Client(reader, writer), random.Random(seed)
+    try:
+        for _ in range(games):
+            moves, result = await play(client, new_args, mistakes, rng, lat, solutions)
+            totals["games"] += 1; totals["moves"] += moves; totals["won"] += result == "won"
+    finally: writer.close(); await writer.wait_closed()
+
+
+async def run(args):
+    server = listener = None
+    if args.local:
+        server = GameServer(args.workers)
+        listener = await server.listen("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        connect = lambda: asyncio.open_connection("127.0.0.1", port, limit=1 << 22)
+    elif args.unix: connect = lambda: asyncio.open_unix_connection(args.unix, limit=1 << 22)
+    else: connect = lambda: asyncio.open_connection(args.host, args.port, limit=1 << 22)
+    new_args = {"mode": args.mode, "difficulty": args.difficulty}
+    if args.race: new_args["seed"] = args.seed
+    lat = {"new": [], "move": []}; totals = {"games": 0, "moves": 0, "won": 0}; solutions = {}
+    t = time.perf_counter()
+    await asyncio.gather(*(run_client(connect, args.games, new_args, args.mistakes, args.seed + i, lat, solutions, totals)
+                           for i in range(args.clients)))
+    wall = time.perf_counter() - t
+    if listener:
+        # Даём серверу дочитать закрытые соединения, иначе asyncio.run отменит их обработчики посреди readline
+        for _ in range(100):
+            if not server.connections: break
+            await asyncio.sleep(0.01)
+        stats = server.stats(); listener.close(); await listener.wait_closed(); server.shutdown()
+    else:
+        reader, writer = await connect(); stats = await Client(reader, writer).call("stats")
+        writer.close(); await writer.wait_closed()
+    return {"clients": args.clients, "wall_s": wall, **totals, "games_per_s": totals["games"] / wall,
+            "moves_per_s": totals["moves"] / wall, "latency": {k: percentiles(v) for k, v in lat.items()},
+            "server": {k: stats[k] for k in ("sessions", "requests", "moves", "joined", "cache")}}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Load test for game_server.py: concurrent clients playing whole games.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--unix", metavar="PATH")
+    p.add_argument("--local", action="store_true", help="run the server in this process")
+    p.add_argument("-w", "--workers", type=int, help="generation processes for --local")
+    p.add_argument("-c", "--clients", type=int, default=50)
+    p.add_argument("-g", "--games", type=int, default=1, help="games per client, one after another")
+    p.add_argument("-m", "--mode", choices=list(MODE_GEOMETRY), default="9x9")
+    p.add_argument("-d", "--difficulty", default="Norm")
+    p.add_argument("--race", action="store_true", help="every client plays the same puzzle (--seed)")
+    p.add_argument("-s", "--seed", type=int, default=12345)
+    p.add_argument("--mistakes", type=float, default=0.05, help="chance of a wrong digit before the right one")
+    p.add_argument("-o", "--output", help="write the report as JSON")
+    args = p.parse_args(argv)
+    out = asyncio.run(run(args))
+    lm, ln = out["latency"]["move"], out["latency"]["new"]
+    print(f"{out['games']} games ({out['won']} won) by {out['clients']} clients in {out['wall_s']:.2f} s: "
+          f"{out['games_per_s']:.1f} games/s, {out['moves_per_s']:.0f} moves/s")
+    if lm["n"]: print(f"move latency p50 {lm['p50_ms']:.3f} ms  p90 {lm['p90_ms']:.3f} ms  p99 {lm['p99_ms']:.3f} ms")
+    if ln["n"]: print(f"new game latency p50 {ln['p50_ms']:.1f} ms  p90 {ln['p90_ms']:.1f} ms  max {ln['max_ms']:.1f} ms")
+    c = out["server"]["cache"]
+    print(f"server: {out['server']['moves']} moves, puzzle cache hits {c['hits']} misses {c['misses']}, "
+          f"{out['server']['joined']} joined a running generation")
+    if args.output:
+        with open(args.output, "w") as f: json.dump(out, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
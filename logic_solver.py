@@ -0,0 +1,304 @@
+from functools import lru_cache
+from itertools import combinations
+
+import sudoku_engine
+from sudoku_engine import MODES_CONFIG, format_cell_value, _units
+
+# --- ЛОГИЧЕСКИЙ РЕШАТЕЛЬ И ОЦЕНКА СЛОЖНОСТИ ---
+# Решает как человек: на каждом шаге применяется самый простой приём, который что-то даёт, и поиск
+# начинается заново с простых. Сложность головоломки — уровень самого трудного понадобившегося приёма
+# (UNSOLVED, если без перебора не решается) и число шагов. Кандидаты — битовые маски, как в sudoku_engine.
+
+UNSOLVED = 7
+
+# Уровни сложности по режиму и названию из MODES_CONFIG: допустимый диапазон уровня самого трудного приёма.
+# Диапазоны подобраны по тому, что доля подсказок реально даёт на каждом размере: недостижимый диапазон
+# только сжигает попытки generate_rated. 6x6 почти всегда решается одиночками — там сложность задаёт
+# одна доля подсказок, как и на больших досках, которые копаются только одиночками (sudoku_engine.dig_node_limit).
+# 9x9 копается до минимальной головоломки около 28% подсказок; на 30–32% примерно каждая десятая доска
+# требует пересечений и каждая двенадцатая — пар или троек, 40% не решаются логикой, x-wing и swordfish
+# почти не встречаются. Поэтому у каждой сложности 9x9 своя нижняя граница, а Hard от Exp отличает только
+# то, что Exp не принимает доски, которые рыба всё-таки решает
+DIFFICULTY_BANDS = {
+    "9x9": {"Easy": (1, 1), "Norm": (2, 2), "Adv": (3, 4), "Hard": (5, UNSOLVED), "Exp": (UNSOLVED, UNSOLVED)},
+    "16x16": {"Easy": (1, 1), "Norm": (1, 2), "Adv": (1, 4), "Hard": (2, UNSOLVED), "Exp": (3, UNSOLVED)},
+}
+
+
+@lru_cache(maxsize=None)
+def _geometry(size, bw, bh):
+    units = _units(size, bw, bh)  # строки, столбцы, блоки
+    n = size; per_row = size // bw
+    cell_units = tuple((r, n + c, 2 * n + (r // bh) * per_row + c // bw) for r in range(n) for c in range(n))
+    peers = [set() for _ in range(n * n)]
+    for unit in units:
+        for i in unit: peers[i].update(unit)
+    peers = tuple(tuple(sorted(p - {i})) for i, p in enumerate(peers))
+    # Пересечения блока с линией: (блок, линия, клетки пересечения, остаток блока, остаток линии)
+    inter = []
+    for b in range(2 * n, 3 * n):
+        box = set(units[b])
+        for li in range(2 * n):
+            common = box & set(units[li])
+            if common: inter.append((b, li, tuple(sorted(common)), tuple(sorted(box - common)), tuple(sorted(set(units[li]) - common))))
+    return units, cell_units, peers, tuple(inter)
+
+
+def unit_name(ui, size):
+    if ui < size: return f"row {ui + 1}"
+    if ui < 2 * size: return f"col {ui - size + 1}"
+    return f"box {ui - 2 * size + 1}"
+
+
+_popcount = getattr(int, "bit_count", None) or (lambda m: bin(m).count("1"))
+
+
+# --- ПРИЁМЫ ---
+# Каждый получает (cand, geo, size, changed, since) и возвращает (постановки [(клетка, цифра, группа)],
+# исключения [(клетка, маска)]) или None. Одиночки собираются пачкой за один проход, остальные приёмы — по одному.
+# changed — (шаг последнего изменения кандидатов в каждой группе, у каждой цифры, клетки с одним кандидатом),
+# since — шаг, на котором приём в прошлый раз ничего не нашёл: группы и цифры, не менявшиеся с тех пор,
+# он не просматривает заново.
+
+def _naked_singles(cand, geo, size, changed, since):
+    out = [(i, cand[i].bit_length() - 1, None) for i in sorted(changed[2])]
+    return (out, []) if out else None
+
+
+def _hidden_singles(cand, geo, size, changed, since):
+    out = []; seen = set(); touched = changed[0]
+    for ui, unit in enumerate(geo[0]):
+        if touched[ui] <= since: continue
+        once = twice = 0
+        for i in unit:
+            m = cand[i]; twice |= once & m; once |= m
+        hidden = once & ~twice
+        while hidden:
+            bit = hidden & -hidden; hidden ^= bit
+            for i in unit:
+                if cand[i] & bit:
+                    if i not in seen: seen.add(i); out.append((i, bit.bit_length() - 1, ui))
+                    break
+    return (out, []) if out else None
+
+
+def _intersection(pointing):
+    # pointing: цифра в блоке только на одной линии — убираем её с остальной линии;
+    # box-line: цифра на линии только внутри одного блока — убираем её с остального блока
+    def technique(cand, geo, size, changed, since):
+        touched = changed[0]
+        for b, li, common, box_rest, line_rest in geo[3]:
+            if touched[b] <= since and touched[li] <= since: continue
+            im = 0
+            for i in common: im |= cand[i]
+            if not im: continue
+            src, dst = (box_rest, line_rest) if pointing else (line_rest, box_rest)
+            rest = 0
+            for i in src: rest |= cand[i]
+            digits = im & ~rest
+            if not digits: continue
+            elims = [(i, cand[i] & digits) for i in dst if cand[i] & digits]
+            if elims: return [], elims
+        return None
+    return technique
+
+
+def _naked_subset(k):
+    def technique(cand, geo, size, changed, since):
+        touched = changed[0]
+        for ui, unit in enumerate(geo[0]):
+            if touched[ui] <= since: continue
+            cells = [i for i in unit if cand[i] and _popcount(cand[i]) <= k]
+            if len(cells) < k: continue
+            for combo in combinations(cells, k):
+                m = 0
+                for i in combo: m |= cand[i]
+                if _popcount(m) != k: continue
+                elims = [(i, cand[i] & m) for i in unit if i not in combo and cand[i] & m]
+                if elims: return [], elims
+        return None
+    return technique
+
+
+def _hidden_subset(k):
+    def technique(cand, geo, size, changed, since):
+        touched = changed[0]
+        for ui, unit in enumerate(geo[0]):
+            if touched[ui] <= since: continue
+            # Цифры, встреченные в группе 1, 2, 3 и 4+ раз: позиции собираются только для тех, что стоят в 1..k клетках
+            once = twice = thrice = more = 0
+            for i in unit:
+                m = cand[i]; more |= thrice & m; thrice |= twice & m; twice |= once & m; once |= m
+            few = once & ~(thrice if k == 2 else more)
+            if _popcount(few) < k: continue
+            pos = {}
+            for p, i in enumerate(unit):
+                m = cand[i] & few
+                while m:
+                    bit = m & -m; m ^= bit; pos[bit] = pos.get(bit, 0) | (1 << p)
+            for combo in combinations(pos, k):
+                pm = dm = 0
+                for d in combo: pm |= pos[d]; dm |= d
+                if _popcount(pm) != k: continue
+                elims = [(i, cand[i] & ~dm) for p, i in enumerate(unit) if pm >> p & 1 and cand[i] & ~dm]
+                if elims: return [], elims
+        return None
+    return technique
+
+
+def _fish(k):
+    # X-Wing (k=2), Swordfish (k=3): цифра в k строках стоит только в k столбцах — убираем её
+    # из этих столбцов в остальных строках (и то же для столбцов)
+    def technique(cand, geo, size, changed, since):
+        units, touched = geo[0], changed[1]
+        digits = 0
+        for d in range(1, size + 1):
+            if touched[d] > since: digits |= 1 << d
+        if not digits: return None
+        # Позиции каждой цифры в строках и столбцах — за один проход по кандидатам
+        in_rows = [[0] * size for _ in range(size + 1)]; in_cols = [[0] * size for _ in range(size + 1)]
+        for i, m in enumerate(cand):
+            m &= digits
+            if not m: continue
+            r, c = divmod(i, size)
+            while m:
+                b = m & -m; m ^= b; d = b.bit_length() - 1
+                in_rows[d][r] |= 1 << c; in_cols[d][c] |= 1 << r
+        for d in range(1, size + 1):
+            if not digits >> d & 1: continue
+            bit = 1 << d
+            for positions, cover in ((in_rows[d], size), (in_cols[d], 0)):
+                lines = [(li, pm) for li, pm in enumerate(positions) if 2 <= _popcount(pm) <= k]
+                for combo in combinations(lines, k):
+                    pm = 0
+                    for _, m in combo: pm |= m
+                    if _popcount(pm) != k: continue
+                    rows = {li for li, _ in combo}
+                    elims = [(i, bit) for p in range(size) if pm >> p & 1
+                             for q, i in enumerate(units[cover + p]) if q not in rows and cand[i] & bit]
+                    if elims: return [], elims
+        return None
+    return technique
+
+
+# (название, уровень, функция) — по возрастанию сложности
+TECHNIQUES = (
+    ("naked single", 1, _naked_singles),
+    ("hidden single", 1, _hidden_singles),
+    ("pointing", 2, _intersection(True)),
+    ("box-line", 2, _intersection(False)),
+    ("naked pair", 3, _naked_subset(2)),
+    ("hidden pair", 3, _hidden_subset(2)),
+    ("naked triple", 4, _naked_subset(3)),
+    ("hidden triple", 4, _hidden_subset(3)),
+    ("x-wing", 5, _fish(2)),
+    ("swordfish", 6, _fish(3)),
+)
+
+
+def solve_steps(board, size, bw, bh, stop_at_placement=False, max_level=UNSOLVED, stop_at_level=None):
+    # Список шагов (название, уровень, постановки, исключения) и флаг "решено". Доску не меняет.
+    # Приёмы сложнее max_level не применяются: доска, которой их не хватает, остаётся нерешённой.
+    # stop_at_level — остановиться после первого шага этого уровня или сложнее
+    geo = _geometry(size, bw, bh)
+    units, cell_units, peers, _ = geo
+    vals = [v for row in board for v in row]
+    full = ((1 << size) - 1) << 1
+    used = [0] * len(units)
+    for i, v in enumerate(vals):
+        if v:
+            for u in cell_units[i]: used[u] |= 1 << v
+    cand = [0 if v else full & ~(used[a] | used[b] | used[c]) for v, (a, b, c) in zip(vals, cell_units)]
+    empty = vals.count(0)
+    steps = []
+    techniques = [t for t in TECHNIQUES if t[1] <= max_level]
+    # Номер шага, на котором менялись кандидаты группы / цифры, и на котором каждый приём в последний раз
+    # ничего не нашёл (см. ПРИЁМЫ): после исключения поиск снова идёт с одиночек, но только по изменившемуся
+    unit_step, digit_step = [0] * len(units), [0] * (size + 1)
+    singles = {i for i, m in enumerate(cand) if m and not m & (m - 1)}
+    changed, clean = (unit_step, digit_step, singles), [-1] * len(techniques)
+    while empty:
+        step = len(steps) + 1
+        for t, (name, level, technique) in enumerate(techniques):
+            found = technique(cand, geo, size, changed, clean[t])
+            if found: break
+            clean[t] = step - 1
+        else: return steps, False
+        placements, elims = found
+        for i, mask in elims:
+            m = cand[i] = cand[i] & ~mask
+            if not m & (m - 1): singles.add(i) if m else singles.discard(i)
+            for u in cell_units[i]: unit_step[u] = step
+            while mask: bit = mask & -mask; mask ^= bit; digit_step[bit.bit_length() - 1] = step
+        for i, v, _ in placements:
+            if vals[i]: continue
+            mask = cand[i]; vals[i] = v; cand[i] = 0; empty -= 1; singles.discard(i)
+            for u in cell_units[i]: unit_step[u] = step
+            while mask: bit = mask & -mask; mask ^= bit; digit_step[bit.bit_length() - 1] = step
+            bit = 1 << v; digit_step[v] = step
+            for p in peers[i]:
+                m = cand[p]
+                if m & bit:
+                    m = cand[p] = m ^ bit
+                    if not m & (m - 1): singles.add(p) if m else singles.discard(p)
+                    for u in cell_units[p]: unit_step[u] = step
+        steps.append((name, level, placements, elims))
+        if stop_at_placement and placements or stop_at_level and level >= stop_at_level: return steps, False
+    return steps, True
+
+
+def rate(board, size, bw, bh, band=None):
+    # (уровень, число шагов, {приём: сколько раз}); уровень UNSOLVED — логикой не решается.
+    # С band = (lo, hi) оценка обрывается, как только ясно, попадает ли уровень в диапазон: понадобился приём
+    # сложнее hi — уровень hi + 1; при hi = UNSOLVED встретился приём уровня lo — уровень не ниже lo, дальше не важно.
+    # Шаги и приёмы тогда посчитаны до остановки
+    lo, hi = band or (1, UNSOLVED)
+    stop = lo if hi == UNSOLVED and lo > 1 else None
+    steps, solved = solve_steps(board, size, bw, bh, max_level=hi, stop_at_level=stop)
+    counts = {}
+    for name, _, placements, _ in steps: counts[name] = counts.get(name, 0) + max(1, len(placements))
+    if solved or stop and steps and steps[-1][1] >= stop: level = max((s[1] for s in steps), default=0)
+    else: level = min(UNSOLVED, hi + 1)
+    return level, sum(counts.values()), counts
+
+
+def next_hint(board, size, bw, bh):
+    # Следующая клетка, которая выводится логикой: ((r, c), значение, пояснение) или None
+    steps, _ = solve_steps(board, size, bw, bh, stop_at_placement=True)
+    if not steps or not steps[-1][2]: return None
+    name, _, placements, _ = steps[-1]
+    i, v, ui = placements[0]
+    r, c = divmod(i, size)
+    text = f"R{r + 1}C{c + 1} = {format_cell_value(v)}: {name}"
+    if ui is not None: text += f" in {unit_name(ui, size)}"
+    if len(steps) > 1: text += f" after {max(steps[:-1], key=lambda s: s[1])[0]}"
+    return (r, c), v, text
+
+
+# --- ГЕНЕРАЦИЯ ПО СЛОЖНОСТИ ---
+def difficulty_band(mode, fill_percent):
+    # None — режим без диапазонов (см. DIFFICULTY_BANDS) или доля не из MODES_CONFIG: генерация без оценки
+    bands = DIFFICULTY_BANDS.get(mode)
+    if not bands: return None
+    for m_id, _, diffs in MODES_CONFIG:
+        if m_id == mode:
+            for d_name, d_val in diffs:
+                if d_val == fill_percent: return bands.get(d_name)
+    return None
+
+
+def generate_rated(size, bw, bh, fill_percent, band=None, rng=None, attempts=None, symmetry="none", stats=None):
+    # Генерирует, пока уровень не попадёт в band; иначе отдаёт ближайшую по уровню из attempts попыток.
+    # stats — как у sudoku_engine.generate_puzzle, плюс rated (сколько досок сгенерировано и оценено)
+    if band is None: return sudoku_engine.generate_puzzle(size, bw, bh, fill_percent, rng=rng, symmetry=symmetry, stats=stats)
+    lo, hi = band
+    attempts = attempts or (24 if size <= 9 else 2)
+    best = None
+    for _ in range(attempts):
+        puzzle, solution = sudoku_engine.generate_puzzle(size, bw, bh, fill_percent, rng=rng, symmetry=symmetry, stats=stats)
+        level = rate(puzzle, size, bw, bh, band)[0]
+        if stats is not None: stats["rated"] = stats.get("rated", 0) + 1
+        miss = lo - level if level < lo else max(0, level - hi)
+        if not miss: return puzzle, solution
+        if best is None or miss < best[0]: best = (miss, puzzle, solution)
+    return best[1], best[2]
@@ -0,0 +1,46 @@
+from array import array
+
+# --- ЖУРНАЛ ХОДОВ ---
+# Каждый ход — одна 32-битная запись в array("I"): клетка (16 бит), было (6), стало (6), флаги (4).
+# Память растёт только с числом ходов и не зависит от размера доски. pos — курсор: записи до него
+# применены, после него — отменённые (для redo); новый ход после undo обрезает хвост.
+
+FLAG_HINT = 1
+FLAG_ERROR = 2
+
+
+def pack_move(cell, old, new, flags=0): return cell | old << 16 | new << 22 | flags << 28
+
+def unpack_move(rec): return rec & 0xFFFF, rec >> 16 & 0x3F, rec >> 22 & 0x3F, rec >> 28
+
+
+class MoveJournal:
+    def __init__(self):
+        self.moves = array("I")
+        self.pos = 0
+
+    def __len__(self): return self.pos
+
+    def record(self, cell, old, new, flags=0):
+        if self.pos < len(self.moves): del self.moves[self.pos:]
+        self.moves.append(pack_move(cell, old, new, flags)); self.pos += 1
+
+    def can_undo(self): return self.pos > 0
+
+    def can_redo(self): return self.pos < len(self.moves)
+
+    def undo(self):
+        # (клетка, было, стало, флаги) отменённого хода или None
+        if not self.pos: return None
+        self.pos -= 1
+        return unpack_move(self.moves[self.pos])
+
+    def redo(self):
+        if self.pos >= len(self.moves): return None
+        self.pos += 1
+        return unpack_move(self.moves[self.pos - 1])
+
+    def move(self, i): return unpack_move(self.moves[i])
+
+    def applied(self):
+        for i in range(self.pos): yield unpack_move(self.moves[i])
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from collections import Counter, deque
+
+# --- ПРОФИЛИРОВАНИЕ ---
+# Выключенный профилировщик ничего не стоит: таймеры подставляются вместо функций только при включении
+# (enable подменяет атрибуты модулей и классов обёртками, disable возвращает оригиналы), а счётчики
+# вызываются лишь на медленных путях — промах кэша глифов, новый шрифт, конец решения.
+# Кадр — список интервалов (имя, начало, длительность, глубина вложенности) и счётчики за кадр;
+# последние HISTORY кадров идут в оверлей и в экспорт (JSON-сводка или Chrome trace для chrome://tracing).
+# Считаются только вызовы из потока, создавшего профилировщик (цикл окна): фоновый поиск подсказки
+# не должен сбивать глубину вложенности кадра.
+
+HISTORY = 120
+
+
+class Profiler:
+    def __init__(self, history=HISTORY):
+        self.enabled = False
+        self.frames = deque(maxlen=history)
+        self.targets = []; self.patched = []
+        self.spans = None; self.counts = Counter()
+        self.depth = 0; self.start = self.last = 0
+        self.origin = time.perf_counter_ns()
+        self.thread = threading.get_ident()
+
+    def instrument(self, owner, names, prefix=""):
+        # owner — модуль или класс; вызовы owner.name идут через таймер (интервал prefix + name), пока профилирование включено
+        self.targets.append((owner, names, prefix))
+
+    def enable(self):
+        if self.enabled: return
+        for owner, names, prefix in self.targets:
+            for name in names:
+                fn = getattr(owner, name)
+                self.patched.append((owner, name, fn)); setattr(owner, name, self._timed(prefix + name, fn))
+        self.frames.clear(); self.enabled = True
+
+    def disable(self):
+        for owner, name, fn in reversed(self.patched): setattr(owner, name, fn)
+        self.patched = []; self.spans = None; self.enabled = False
+
+    def toggle(self): self.disable() if self.enabled else self.enable()
+
+    def _timed(self, name, fn):
+        def timed(*args, **kw):
+            if threading.get_ident() != self.thread: return fn(*args, **kw)
+            t = time.perf_counter_ns(); self.depth += 1
+            try: return fn(*args, **kw)
+            finally:
+                self.depth -= 1
+                if self.spans is not None: self.spans.append((name, t, time.perf_counter_ns() - t, self.depth))
+        timed.__wrapped__ = fn
+        return timed
+
+    # --- КАДР ---
+    def begin_frame(self):
+        self.spans = []; self.counts = Counter(); self.last = self.start = time.perf_counter_ns()
+
+    def mark(self, name):
+        # Интервал от предыдущей отметки (или начала кадра) до сейчас — для кода прямо в главном цикле
+        now = time.perf_counter_ns()
+        if self.spans is not None: self.spans.append((name, self.last, now - self.last, 0))
+        self.last = now
+
+    def count(self, name, n=1):
+        if self.enabled: self.counts[name] += n
+
+    def end_frame(self):
+        if self.spans is None: return
+        self.frames.append((self.start, time.perf_counter_ns() - self.start, self.spans, self.counts))
+        self.spans = None
+
+    # --- СВОДКА И ЭКСПОРТ ---
+    def summary(self):
+        # {имя: (вызовов, всего мс, среднее за кадр мс, максимум мс)} по сохранённым кадрам
+        stats = {}; n = len(self.frames) or 1
+        for _, _, spans, _ in self.frames:
+            for name, _, dur, _ in spans:
+                s = stats.setdefault(name, [0, 0, 0]); s[0] += 1; s[1] += dur; s[2] = max(s[2], dur)
+        return {name: (calls, total / 1e6, total / n / 1e6, peak / 1e6) for name, (calls, total, peak) in stats.items()}
+
+    def frame_stats(self):
+        # (последний кадр, среднее, максимум) в мс
+        if not self.frames: return 0.0, 0.0, 0.0
+        d = [f[1] for f in self.frames]
+        return d[-1] / 1e6, sum(d) / len(d) / 1e6, max(d) / 1e6
+
+    def counters(self):
+        total = Counter()
+        for f in self.frames: total.update(f[3])
+        return total
+
+    def export_json(self, path):
+        last, avg, peak = self.frame_stats()
+        data = {"frames": len(self.frames), "frame_ms": {"last": last, "avg": avg, "max": peak},
+                "spans": {name: dict(zip(("calls", "total_ms", "avg_ms_per_frame", "max_ms"), s)) for name, s in self.summary().items()},
+                "counters": dict(self.counters()),
+                "per_frame": [{"ms": dur / 1e6, "counts": dict(counts)} for _, dur, _, counts in self.frames]}
+        with open(path, "w") as f: json.dump(data, f, indent=2)
+
+    def export_trace(self, path):
+        # Формат Trace Event: "X" — интервал, "C" — счётчики кадра; время в микросекундах
+        us = lambda t: (t - self.origin) / 1000
+        events = []
+        for start, dur, spans, counts in self.frames:
+            events.append({"name": "frame", "ph": "X", "ts": us(start), "dur": dur / 1000, "pid": 1, "tid": 1})
+            for name, t, d, _ in spans: events.append({"name": name, "ph": "X", "ts": us(t), "dur": d / 1000, "pid": 1, "tid": 1})
+            if counts: events.append({"name": "counters", "ph": "C", "ts": us(start), "pid": 1, "args": dict(counts)})
+        with open(path, "w") as f: json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,127 @@
+import mmap
+import os
+import random
+import shutil
+import struct
+import tempfile
+
+# --- БАНК ГОЛОВОЛОМОК ---
+# Файл: заголовок + таблица секций (режим, сложность) + записи фиксированного размера.
+# Запись = подсказки (0 — пустая клетка) и решение, по bits бит на клетку (4 для 6x6/9x9, 5 для 16x16/25x25, 6 для 36x36).
+# Файл открывается через mmap, так что случайная головоломка читается за O(1) без чтения всего файла.
+
+MAGIC = b"SDKB"
+# Секции ключуются долей подсказок; версия растёт, когда меняется доля или диапазон сложности за названием
+# (2: новые доли 16x16 и диапазоны по режимам; 3: нижние границы и доли 9x9) — банк старой версии не открывается,
+# его надо сгенерировать заново
+VERSION = 3
+HEADER = struct.Struct("<4sHH")                # magic, version, число секций
+SECTION = struct.Struct("<8sHBBBBIIQ")         # режим, сложность*1000, size, bw, bh, bits, размер записи, число записей, смещение
+
+
+def cell_bits(size): return max(4, size.bit_length())
+
+def record_size(size): return (2 * size * size * cell_bits(size) + 7) // 8
+
+def difficulty_key(fill_percent): return int(round(fill_percent * 1000))
+
+
+def pack_record(puzzle, solution, size):
+    bits = cell_bits(size); v = 0
+    for row in reversed(solution):
+        for val in reversed(row): v = (v << bits) | val
+    for row in reversed(puzzle):
+        for val in reversed(row): v = (v << bits) | val
+    return v.to_bytes(record_size(size), "little")
+
+
+def unpack_record(data, size, bits=None):
+    bits = bits or cell_bits(size); mask = (1 << bits) - 1
+    v = int.from_bytes(data, "little")
+    cells = []
+    for _ in range(2 * size * size):
+        cells.append(v & mask); v >>= bits
+    nn = size * size
+    puzzle = [cells[r * size:(r + 1) * size] for r in range(size)]
+    solution = [cells[nn + r * size:nn + (r + 1) * size] for r in range(size)]
+    return puzzle, solution
+
+
+class BankWriter:
+    # Записи каждой секции копятся во временном файле, при close() собирается итоговый файл
+    # и атомарно подменяет старый (os.replace). append=True сохраняет секции уже существующего банка.
+    def __init__(self, path, append=False):
+        self.path = path
+        self.sections = {}
+        old = open_bank(path) if append else None
+        if old:
+            for key, (size, bw, bh, bits, rs, count, offset) in old.sections.items():
+                spool = tempfile.TemporaryFile(); spool.write(old.data[offset:offset + rs * count])
+                self.sections[key] = [(size, bw, bh), spool, count]
+            old.close()
+
+    def add(self, mode, fill_percent, geometry, puzzle, solution):
+        key = (mode.encode()[:8].decode(), difficulty_key(fill_percent))
+        sec = self.sections.get(key)
+        if sec is None: sec = self.sections[key] = [geometry, tempfile.TemporaryFile(), 0]
+        sec[1].write(pack_record(puzzle, solution, geometry[0])); sec[2] += 1
+
+    def close(self):
+        offset = HEADER.size + SECTION.size * len(self.sections)
+        table = []
+        for (mode, diff), ((size, bw, bh), _, count) in self.sections.items():
+            rs = record_size(size)
+            table.append(SECTION.pack(mode.encode()[:8], diff, size, bw, bh, cell_bits(size), rs, count, offset))
+            offset += rs * count
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(table)))
+            for entry in table: f.write(entry)
+            for _, spool, _ in self.sections.values():
+                spool.seek(0); shutil.copyfileobj(spool, f); spool.close()
+        os.replace(tmp, self.path)
+        self.sections = {}
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+
+class PuzzleBank:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, n = HEADER.unpack_from(self.data, 0)
+            if magic != MAGIC or version != VERSION: raise ValueError(f"not a puzzle bank: {path}")
+            self.sections = {}
+            for i in range(n):
+                mode, diff, size, bw, bh, bits, rs, count, offset = SECTION.unpack_from(self.data, HEADER.size + i * SECTION.size)
+                if offset + rs * count > len(self.data): raise ValueError(f"truncated puzzle bank: {path}")
+                self.sections[(mode.rstrip(b"\0").decode(), diff)] = (size, bw, bh, bits, rs, count, offset)
+        except Exception:
+            self.file.close(); raise
+
+    def count(self, mode, fill_percent):
+        sec = self.sections.get((mode, difficulty_key(fill_percent)))
+        return sec[5] if sec else 0
+
+    def get(self, mode, fill_percent, index):
+        size, _, _, bits, rs, count, offset = self.sections[(mode, difficulty_key(fill_percent))]
+        if not 0 <= index < count: raise IndexError(index)
+        start = offset + index * rs
+        return unpack_record(self.data[start:start + rs], size, bits)
+
+    def random_puzzle(self, mode, fill_percent, rng=None):
+        n = self.count(mode, fill_percent)
+        if not n: return None
+        return self.get(mode, fill_percent, (rng or random).randrange(n))
+
+    def close(self):
+        self.data.close(); self.file.close()
+
+
+def open_bank(path):
+    # None, если банка нет или он повреждён: тогда головоломки генерируются на лету
+    if not os.path.exists(path): return None
+    try: return PuzzleBank(path)
+    except (OSError, ValueError, struct.error): return None
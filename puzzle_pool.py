@@ -0,0 +1,112 @@
+import collections
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from puzzle_seeds import generate_seeded, new_seed
+
+# --- ФОНОВАЯ ГЕНЕРАЦИЯ ---
+# Пул процессов держит небольшую очередь готовых головоломок для каждой пары (режим, сложность).
+# Интерфейс только забирает готовое (O(1)); генерация всегда идёт в воркерах.
+# Seed выбирается здесь, в главном процессе, и возвращается вместе с головоломкой: (seed, (условие, решение)).
+# Головоломка с заданным seed (код, ежедневная, рестарт) заказывается через request и забирается через take;
+# пока такой заказ не выполнен, очередь не пополняется, чтобы он не ждал за фоновыми задачами.
+
+def _generate_job(mode, fill_percent, seed):
+    return seed, generate_seeded(mode, fill_percent, seed)
+
+
+class PuzzlePool:
+    def __init__(self, keys, per_key=2, workers=None):
+        self.keys = list(keys)
+        self.per_key = per_key
+        self.workers = workers or max(1, min(4, (multiprocessing.cpu_count() or 2) - 1))
+        self.ready = {k: collections.deque() for k in self.keys}
+        self.in_flight = collections.Counter()
+        self.wanted = collections.deque()
+        self.seeded = {}
+        self.lock = threading.RLock()
+        self.executor = None
+
+    def start(self):
+        # Не fork: к моменту, когда понадобится новый воркер, в окне уже живут поток ассетов и SDL,
+        # и форк их копии может зависнуть на чужой блокировке. forkserver порождает воркеры из чистого процесса;
+        # движок он импортирует заранее, один раз, а не в каждом воркере
+        ctx = None
+        if sys.platform.startswith("linux"):
+            ctx = multiprocessing.get_context("forkserver"); ctx.set_forkserver_preload(["puzzle_seeds"])
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+        with self.lock: self._dispatch()
+
+    def shutdown(self):
+        if self.executor: self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+
+    def alive(self): return self.executor is not None
+
+    def serves(self, key):
+        # Очередь есть только у ключей из конструктора; сложность вне меню (из кода) — только через request
+        return self.executor is not None and key in self.ready
+
+    def pop(self, key):
+        # Готовая пара (seed, головоломка) или None; при промахе ключ встаёт в начало очереди генерации.
+        # Для ключа без очереди (см. serves) — всегда None
+        with self.lock:
+            q = self.ready.get(key)
+            if q is None: return None
+            puzzle = q.popleft() if q else None
+            if puzzle is None and key not in self.wanted: self.wanted.append(key)
+            self._dispatch()
+            return puzzle
+
+    def request(self, key, seed):
+        # False — пул не работает, генерировать придётся самому
+        with self.lock:
+            if not self.executor: return False
+            if (key, seed) in self.seeded: return True
+            try: self.seeded[(key, seed)] = self.executor.submit(_generate_job, *key, seed)
+            except RuntimeError: self.executor = None; return False
+            return True
+
+    def take(self, key, seed):
+        # (seed, головоломка) по заказу request или None, пока генерируется. Сломанный пул — тоже None,
+        # и alive() становится False; ошибка самой генерации поднимается, как при генерации на месте
+        with self.lock:
+            fut = self.seeded.get((key, seed))
+            if fut is None or not fut.done(): return None
+            del self.seeded[(key, seed)]
+            self._dispatch()
+            if fut.cancelled() or isinstance(fut.exception(), RuntimeError): self.executor = None; return None
+            return fut.result()
+
+    def ready_count(self, key):
+        with self.lock: return len(self.ready.get(key, ()))
+
+    def _next_key(self):
+        for key in self.wanted:
+            if not self.in_flight[key]: return key
+        best, best_have = None, self.per_key
+        for key in self.keys:
+            have = len(self.ready[key]) + self.in_flight[key]
+            if have < best_have: best, best_have = key, have
+        return best
+
+    def _dispatch(self):
+        while self.executor and not self.seeded and sum(self.in_flight.values()) < self.workers:
+            key = self._next_key()
+            if key is None: return
+            try: fut = self.executor.submit(_generate_job, *key, new_seed())
+            except RuntimeError:
+                # Пул сломан или закрыт: дальше интерфейс генерирует сам
+                self.executor = None; return
+            self.in_flight[key] += 1
+            fut.add_done_callback(lambda f, key=key: self._on_done(key, f))
+
+    def _on_done(self, key, fut):
+        with self.lock:
+            self.in_flight[key] -= 1
+            if not fut.cancelled() and fut.exception() is None:
+                self.ready[key].append(fut.result())
+                if key in self.wanted: self.wanted.remove(key)
+            self._dispatch()
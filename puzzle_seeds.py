@@ -0,0 +1,91 @@
+import datetime
+import random
+from collections import OrderedDict
+
+from sudoku_engine import MODE_GEOMETRY, fill_range
+from logic_solver import difficulty_band, generate_rated
+from puzzle_bank import difficulty_key
+
+# --- ГОЛОВОЛОМКИ ПО SEED ---
+# Генерация идёт от своего random.Random(seed), а не от глобального random, поэтому тройка
+# (режим, сложность, seed) однозначно задаёт головоломку — в любом процессе и при любом запуске.
+# На этом стоят код головоломки ("9x9-320-1f3a9c2b-3": режим, сложность*1000, seed в hex, версия генератора),
+# ежедневная головоломка (seed из даты) и рестарт. Готовые пары (условие, решение) лежат в LRU-кэше,
+# чтобы повторный запрос не решал доску заново.
+
+CACHE_SIZE = 32
+SEED_BITS = 32
+# Та же тройка даёт другую головоломку, когда меняются доли подсказок или диапазоны сложности, —
+# код другой версии не принимается, вместо того чтобы молча открыть другую доску (как VERSION банка)
+CODE_VERSION = 3
+
+
+def generate_seeded(mode, fill_percent, seed):
+    size, bw, bh = MODE_GEOMETRY[mode]
+    return generate_rated(size, bw, bh, fill_percent, difficulty_band(mode, fill_percent), rng=random.Random(seed))
+
+
+def new_seed(): return random.getrandbits(SEED_BITS)
+
+
+def daily_seed(day=None):
+    # 2026-10-18 -> 20261018: одна головоломка на день для всех
+    day = day or datetime.date.today()
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def puzzle_code(mode, fill_percent, seed): return f"{mode}-{difficulty_key(fill_percent)}-{seed:x}-{CODE_VERSION}"
+
+
+def parse_puzzle_code(code):
+    # (режим, сложность, seed); ValueError, если код не разбирается, режим неизвестен
+    # или сложность и seed вне того, что выдаёт игра (fill_range режима, SEED_BITS)
+    parts = code.strip().split("-")
+    if len(parts) == 3 or (len(parts) == 4 and parts[3] != str(CODE_VERSION)):
+        raise ValueError(f"puzzle code from another game version: {code}")
+    try:
+        mode, diff, seed, _ = parts
+        fill, seed = int(diff) / 1000, int(seed, 16)
+    except ValueError: raise ValueError(f"bad puzzle code: {code}") from None
+    if mode not in MODE_GEOMETRY: raise ValueError(f"unknown mode: {mode}")
+    lo, hi = fill_range(mode)
+    if not lo <= fill <= hi: raise ValueError(f"difficulty out of range for {mode}: {diff}")
+    if not 0 <= seed < 1 << SEED_BITS: raise ValueError(f"seed out of range: {seed:x}")
+    return mode, fill, seed
+
+
+class PuzzleCache:
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, mode, fill_percent, seed):
+        # Копии досок: вызывающий может их менять, в кэше остаются оригиналы
+        puzzle = self.lookup(mode, fill_percent, seed)
+        if puzzle is None:
+            puzzle = generate_seeded(mode, fill_percent, seed)
+            self.put(mode, fill_percent, seed, puzzle)
+        return puzzle
+
+    def lookup(self, mode, fill_percent, seed):
+        # Как get, но без генерации: при промахе None (сервер генерирует сам, в пуле процессов, и кладёт через put)
+        key = (mode, difficulty_key(fill_percent), seed)
+        puzzle = self.items.get(key)
+        if puzzle is None: self.misses += 1; return None
+        self.hits += 1; self.items.move_to_end(key)
+        return tuple(b.copy() for b in puzzle)
+
+    def put(self, mode, fill_percent, seed, puzzle):
+        # Готовое со стороны (из пула) — тоже в кэш, без подсчёта промаха
+        key = (mode, difficulty_key(fill_percent), seed)
+        self.items[key] = tuple(b.copy() for b in puzzle); self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False); self.evictions += 1
+
+    def __len__(self): return len(self.items)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self.items),
+                "maxsize": self.maxsize, "hit_rate": self.hits / total if total else 0.0}
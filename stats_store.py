@@ -0,0 +1,64 @@
+import json
+import os
+import threading
+
+# --- ХРАНИЛИЩЕ СТАТИСТИКИ ---
+# Файл читается один раз, дальше всё в памяти. Запись отложенная: изменения копятся delay секунд
+# и сбрасываются одним атомарным write (временный файл + os.replace), так что оборванная запись
+# не портит старый файл. Подписчики получают новое значение ключа только когда оно реально меняется.
+
+class StatsStore:
+    def __init__(self, path, defaults, delay=2.0):
+        self.path = path
+        self.defaults = dict(defaults)
+        self.delay = delay
+        self.data = None
+        self.listeners = {}
+        self.lock = threading.RLock()
+        self.timer = None
+        self.dirty = False
+
+    def load(self):
+        data = dict(self.defaults)
+        try:
+            with open(self.path, "r") as f: saved = json.load(f)
+            if isinstance(saved, dict): data.update(saved)
+        except (OSError, ValueError): pass
+        with self.lock: self.data = data
+
+    def get(self, key):
+        with self.lock:
+            if self.data is None: self.load()
+            return self.data.get(key, self.defaults.get(key))
+
+    def subscribe(self, key, callback):
+        self.listeners.setdefault(key, []).append(callback)
+
+    def update(self, **values):
+        with self.lock:
+            if self.data is None: self.load()
+            changed = {k: v for k, v in values.items() if self.data.get(k) != v}
+            if not changed: return
+            self.data.update(changed)
+            self.dirty = True
+            if self.timer is None:
+                self.timer = threading.Timer(self.delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        for key, value in changed.items():
+            for cb in self.listeners.get(key, ()): cb(value)
+
+    def flush(self):
+        with self.lock:
+            if self.timer: self.timer.cancel()
+            self.timer = None
+            if not self.dirty: return
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w") as f:
+                    json.dump(self.data, f); f.flush(); os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                self.dirty = False
+            except OSError: pass  # останется dirty, попробуем при следующем flush
+
+    def close(self): self.flush()
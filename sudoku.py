@@ -1,26 +1,37 @@
 import pygame
 import sys
-import random
 import time
-import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+import sudoku_engine
+import logic_solver
+from sudoku_engine import Constraints, format_cell_value, parse_cell_value, SOLVERS, DEFAULT_SOLVER, MODE_GEOMETRY, MODES_CONFIG, LARGE_SIZE, difficulty_fill
+from puzzle_pool import PuzzlePool
+from puzzle_bank import open_bank
+from puzzle_seeds import PuzzleCache, generate_seeded, new_seed, daily_seed, puzzle_code, parse_puzzle_code
+from stats_store import StatsStore
+from game_history import GameHistory
+from assets import AssetManager
+from logic_solver import difficulty_band, generate_rated, next_hint
+from move_journal import MoveJournal, FLAG_HINT, FLAG_ERROR, unpack_move
+from game_save import GameSave
+from game_session import GameSession
+from layout import Layout
+from profiler import Profiler
 
 # --- НАСТРОЙКИ ---
 WIDTH, HEIGHT = 540, 950
-SCREEN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Sudoku: Infinite Edition")
+# Окно можно растягивать (см. resize_window), но не меньше MIN_SIZE: меньше не влезает выбор режима —
+# три колонки по 140 px (значок ранга 120 px) и два ряда по пять кнопок сложности высотой 35 px
+MIN_SIZE = (480, 760)
+# Импорт модуля не трогает pygame: окно, шрифты и кнопки создаёт init_ui() из main()
+SCREEN = None
+# Встроенный профилировщик (F3), выключен по умолчанию — см. раздел ПРОФИЛИРОВАНИЕ
+profiler = Profiler()
 
-pygame.init()
-
-# --- ШРИФТЫ ---
-FONT_XL = pygame.font.SysFont("Arial", 60, bold=True)
-FONT_L = pygame.font.SysFont("Arial", 45, bold=True)
-FONT_M = pygame.font.SysFont("Arial", 24, bold=True)
-FONT = pygame.font.SysFont("Arial", 35)
-SMALL_FONT = pygame.font.SysFont("Arial", 20)
-CANDIDATE_FONT = pygame.font.SysFont("Arial", 12, bold=True) 
-BTN_FONT = pygame.font.SysFont("Arial", 20, bold=True)
-ICON_FONT = pygame.font.SysFont("Segoe UI Symbol", 28) 
+# --- ШРИФТЫ (см. init_ui) ---
+FONT_XL = FONT_L = FONT_M = FONT = SMALL_FONT = CANDIDATE_FONT = BTN_FONT = ICON_FONT = None
 
 # --- ЦВЕТОВЫЕ ТЕМЫ ---
 THEMES = {
@@ -103,30 +114,116 @@ is_fast_mode = False
 
 error_history_cells = set()
 hint_used_cells = set()
+scored_cells = set()
+journal = MoveJournal()
+# Текущая партия (game_session.GameSession): правила ходов, проверки и подсказок — общие с сервером
+session = None
 
 splash_start_time = 0
-# Переменная для хранения загруженного интро-изображения
-splash_image = None
 
-# КЭШ КАРТИНОК РАНГОВ
-loaded_rank_images = {}
+# ЗАСТАВКА И ЗНАЧКИ РАНГОВ: грузятся в фоне с первого кадра (см. assets.py), создаётся в main()
+assets = None
+
+# ПУЛ ГОТОВЫХ ГОЛОВОЛОМОК И БАНК НА ДИСКЕ (открываются в main)
+puzzle_pool = None
+puzzle_bank = None
+BANK_FILE = "sudoku_bank.bin"
+# Головоломки по seed (пул, своя генерация, ежедневная, код) — в LRU-кэше; у головоломок банка seed нет
+puzzle_cache = PuzzleCache()
+current_seed = None
+# Seed головоломки, которую по заказу генерирует пул (экран LOADING); None — ждём любую из очереди
+pending_seed = None
+DAILY = ("9x9", "Adv")
+
+# --- ЧАСТОТА КАДРОВ ---
+# "adaptive": вне анимаций цикл спит в pygame.event.wait и просыпается от ввода, раз в секунду для таймера
+# или раз в idle_timeout_ms; "fixed": старое поведение, перерисовка fps раз в секунду всегда
+FRAME_POLICY = {"mode": "adaptive", "fps": 30, "idle_timeout_ms": 1000}
+ANIMATED_STATES = ("SPLASH", "LOADING", "REPLAY")
 
 def get_color(key): return THEMES[current_theme_name][key]
 
+# --- КЭШ ШРИФТОВ И ГЛИФОВ ---
+# Шрифты создаются один раз на (имя, размер, жирность); готовые поверхности текста
+# хранятся по (шрифт, текст, цвет). Смена темы сбрасывает кэш глифов.
+GLYPH_CACHE_MAX = 2048
+_font_cache = {}
+_glyph_cache = {}
+_digit_atlas = {}
+
+def get_font(name, size, bold=False):
+    key = (name, size, bold)
+    f = _font_cache.get(key)
+    if f is None: f = _font_cache[key] = pygame.font.SysFont(name, size, bold=bold); profiler.count("SysFont")
+    return f
+
+def render_text(font, text, color):
+    key = (font, text, color)
+    surf = _glyph_cache.get(key)
+    if surf is None:
+        if len(_glyph_cache) >= GLYPH_CACHE_MAX: del _glyph_cache[next(iter(_glyph_cache))]
+        surf = _glyph_cache[key] = font.render(text, True, color); profiler.count("font.render")
+    return surf
+
+def digit_glyphs(font_size, color):
+    # Атлас цифр для текущего размера клетки: glyphs[v] — поверхность для значения v
+    key = (font_size, color, max_digit)
+    glyphs = _digit_atlas.get(key)
+    if glyphs is None:
+        f = get_font("Arial", font_size)
+        glyphs = _digit_atlas[key] = [None] + [f.render(format_cell_value(v), True, color) for v in range(1, max_digit + 1)]
+        profiler.count("font.render", max_digit)
+    return glyphs
+
+def clear_glyph_cache(): _glyph_cache.clear(); _digit_atlas.clear(); reset_best_label()
+
 # --- СОХРАНЕНИЕ ---
 DATA_FILE = "sudoku_data.json"
-def load_data():
-    if not os.path.exists(DATA_FILE): return {"best_time": None, "games_played": 0}
-    try: 
-        with open(DATA_FILE, "r") as f: return json.load(f)
-    except: return {"best_time": None, "games_played": 0}
+# Читается один раз в main(), пишется отложенно и атомарно (см. stats_store.py)
+stats = StatsStore(DATA_FILE, {"best_time": None, "games_played": 0})
 
 def save_game_result(time_ms):
-    data = load_data()
-    data["games_played"] += 1
-    if data["best_time"] is None or time_ms < data["best_time"]:
-        data["best_time"] = time_ms
-    with open(DATA_FILE, "w") as f: json.dump(data, f)
+    best = stats.get("best_time")
+    stats.update(games_played=stats.get("games_played") + 1,
+                 best_time=time_ms if best is None or time_ms < best else best)
+
+# История партий по режимам и сложностям (см. game_history.py), открывается в main()
+HISTORY_FILE = "sudoku_history.db"
+history = None
+
+def record_finished_game(won, time_ms, lives_left=None):
+    if history is None: return
+    lives_left = lives if lives_left is None else lives_left
+    history.record(current_mode_type, difficulty_fill_percent, won, time_ms, score, 3 - lives_left, len(hint_used_cells))
+
+# Незаконченная партия: заголовок при старте + запись на каждый ход (см. game_save.py), открывается в main()
+SAVE_FILE = "sudoku_save.bin"
+AUTOSAVE_INTERVAL_MS = 10000
+autosave = None
+last_autosave = None
+
+def autosave_record(kind, move=0):
+    global last_autosave
+    if autosave is None or autosave.file is None: return
+    # Очки и жизни — из партии: on_move приходит до sync_session()
+    last_autosave = (session.score, session.lives, get_current_game_time())
+    autosave.append(kind, move, *last_autosave)
+
+def autosave_tick():
+    # Снимок состояния, если изменились очки/жизни или время ушло вперёд
+    if autosave is None or not is_game_active or game_state != "GAME": return
+    if last_autosave is None or last_autosave[:2] != (score, lives) or get_current_game_time() - last_autosave[2] >= AUTOSAVE_INTERVAL_MS:
+        autosave_record(b"S")
+
+def discard_autosave():
+    if autosave: autosave.discard()
+
+# Надпись "Best" в меню рендерится заново только при смене рекорда или темы
+best_label = None
+def reset_best_label(_=None):
+    global best_label
+    best_label = None
+stats.subscribe("best_time", reset_best_label)
 
 # --- UI CLASS ---
 class Button:
@@ -147,7 +244,7 @@ class Button:
         pygame.draw.rect(screen, base_c, draw_rect, border_radius=10)
         pygame.draw.rect(screen, get_color("grid_line"), draw_rect, 2, border_radius=10)
         f = self.custom_font if self.custom_font else (ICON_FONT if self.icon else BTN_FONT)
-        txt_surf = f.render(self.text, True, get_color("text_main"))
+        txt_surf = render_text(f, self.text, get_color("text_main"))
         screen.blit(txt_surf, txt_surf.get_rect(center=draw_rect.center))
 
     def check_hover(self, pos): self.hovered = self.rect.collidepoint(pos)
@@ -160,49 +257,37 @@ class Button:
             self.pressed = False
 
 # --- LOGIC ---
-def is_valid_logic(board, row, col, num, size, bw, bh):
-    for x in range(size):
-        if board[row][x] == num: return False
-    for x in range(size):
-        if board[x][col] == num: return False
-    sr, sc = row - row % bh, col - col % bw
-    for i in range(bh):
-        for j in range(bw):
-            if board[i + sr][j + sc] == num: return False
-    return True
-
 def get_candidates(board, r, c):
-    return [num for num in range(1, max_digit + 1) if is_valid_logic(board, r, c, num, grid_size, box_w, box_h)]
-
-def solve_algo(board):
-    for i in range(grid_size):
-        for j in range(grid_size):
-            if board[i][j] == 0:
-                nums = list(range(1, max_digit + 1)); random.shuffle(nums)
-                for num in nums:
-                    if is_valid_logic(board, i, j, num, grid_size, box_w, box_h):
-                        board[i][j] = num
-                        if solve_algo(board): return True
-                        board[i][j] = 0
-                return False
-    return True
-
-def generate_puzzle():
-    board = [[0]*grid_size for _ in range(grid_size)]
-    solve_algo(board)
-    full_solution = [row[:] for row in board]
-    total = grid_size * grid_size
-    keep = int(total * difficulty_fill_percent)
-    remove = total - keep
-    attempts = remove
-    while attempts > 0:
-        r, c = random.randint(0, grid_size - 1), random.randint(0, grid_size - 1)
-        if board[r][c] != 0: board[r][c] = 0
-        attempts -= 1
-    return board, full_solution
+    cons = grid_cons if board is grid and grid_cons else Constraints(board, grid_size, box_w, box_h)
+    return cons.candidates(r, c)
+
+# solver: "dlx" (танцующие ссылки) или "backtrack" (старый перебор, для сравнения)
+def solve_algo(board, solver="backtrack"):
+    stats = {} if profiler.enabled else None
+    found = SOLVERS[solver](board, grid_size, box_w, box_h, stats=stats)
+    count_stats(solver, stats)
+    return bool(found)
+
+def count_stats(prefix, stats):
+    # Счётчики решателя и генератора (stats передаётся, только пока профилировщик включён) — в оверлей
+    if stats:
+        for k, v in stats.items(): profiler.count(f"{prefix}.{k}", v)
+
+def generate_puzzle(solver=DEFAULT_SOLVER, symmetry="none"):
+    if puzzle_bank:
+        puzzle = puzzle_bank.random_puzzle(current_mode_type, difficulty_fill_percent)
+        if puzzle: return puzzle
+    band = difficulty_band(current_mode_type, difficulty_fill_percent)
+    stats = {} if profiler.enabled else None
+    if band and solver == DEFAULT_SOLVER:
+        puzzle = generate_rated(grid_size, box_w, box_h, difficulty_fill_percent, band, symmetry=symmetry, stats=stats)
+    else: puzzle = sudoku_engine.generate_puzzle(grid_size, box_w, box_h, difficulty_fill_percent, solver, symmetry=symmetry, stats=stats)
+    count_stats("generate", stats)
+    return puzzle
 
 # --- GAME CONTROLLER ---
 initial_grid, solved_grid, grid, validation_grid = None, None, None, None
+grid_cons = None
 selected_cell, selected_digit = None, None
 message = ""
 
@@ -210,37 +295,121 @@ def set_mode_parameters(mode_name, diff_percent):
     global current_mode_type, grid_size, box_w, box_h, max_digit, difficulty_fill_percent
     current_mode_type = mode_name
     difficulty_fill_percent = diff_percent
-    if mode_name == "6x6": grid_size = 6; box_w = 3; box_h = 2; max_digit = 6
-    elif mode_name == "9x9": grid_size = 9; box_w = 3; box_h = 3; max_digit = 9
-    elif mode_name == "16x16": grid_size = 16; box_w = 4; box_h = 4; max_digit = 16
+    if mode_name in MODE_GEOMETRY:
+        grid_size, box_w, box_h = MODE_GEOMETRY[mode_name]; max_digit = grid_size
 
 def start_game_with_params(mode, diff_val):
     set_mode_parameters(mode, diff_val)
     start_new_game()
 
 def start_new_game():
-    global initial_grid, solved_grid, grid, validation_grid, selected_cell, selected_digit 
-    global message, game_state, lives, score, start_ticks, elapsed_time, is_game_active, is_check_mode
-    global is_notes_mode, is_super_hint_mode, is_fast_mode, error_history_cells, hint_used_cells
-    
-    initial_grid, solved_grid = generate_puzzle()
-    grid = [row[:] for row in initial_grid]
-    validation_grid = [[None]*grid_size for _ in range(grid_size)]
-    selected_cell = None; selected_digit = 1
-    message = ""; lives = 3; score = 0
+    # Сначала банк на диске, потом очередь пула; если она пуста — экран загрузки, пока воркер не закончит.
+    # Сложность не из меню (после кода) очереди не имеет: новый seed, заказ в пул
+    global game_state, pending_seed
+    key = (current_mode_type, difficulty_fill_percent)
+    if puzzle_bank and puzzle_bank.count(*key): begin_game(generate_puzzle())
+    elif puzzle_pool and puzzle_pool.serves(key):
+        item = puzzle_pool.pop(key)
+        if item is None: pending_seed = None; game_state = "LOADING"; return
+        begin_pooled_game(item)
+    else: start_seeded_game(new_seed())
+
+def poll_pending_game():
+    global pending_seed
+    key = (current_mode_type, difficulty_fill_percent)
+    item = None
+    if puzzle_pool and puzzle_pool.alive():
+        item = puzzle_pool.pop(key) if pending_seed is None else puzzle_pool.take(key, pending_seed)
+    if not (puzzle_pool and puzzle_pool.alive()):
+        # Пул сломался, пока мы ждали: генерируем здесь, тот же seed, если он был задан
+        seed, pending_seed = pending_seed, None
+        start_seeded_game(new_seed() if seed is None else seed)
+    elif item: pending_seed = None; begin_pooled_game(item)
+
+def begin_pooled_game(item):
+    seed, puzzle = item
+    puzzle_cache.put(current_mode_type, difficulty_fill_percent, seed, puzzle)
+    begin_game(puzzle, seed=seed)
+
+def start_seeded_game(seed):
+    # Тот же seed — та же головоломка; повтор (рестарт, ежедневная, код) берётся из кэша без генерации,
+    # промах уходит в пул с этим seed (экран загрузки), и только без пула генерируется здесь
+    global game_state, pending_seed
+    puzzle = puzzle_cache.lookup(current_mode_type, difficulty_fill_percent, seed)
+    if puzzle is None:
+        if puzzle_pool and puzzle_pool.request((current_mode_type, difficulty_fill_percent), seed):
+            pending_seed = seed; game_state = "LOADING"; return
+        puzzle = generate_seeded(current_mode_type, difficulty_fill_percent, seed)
+        puzzle_cache.put(current_mode_type, difficulty_fill_percent, seed, puzzle)
+    begin_game(puzzle, seed=seed)
+
+def restart_game():
+    if current_seed is None: begin_game((initial_grid, solved_grid))
+    else: start_seeded_game(current_seed)
+
+def start_daily_game():
+    set_mode_parameters(DAILY[0], difficulty_fill(*DAILY))
+    start_seeded_game(daily_seed())
+
+def start_code_game(code):
+    mode, fill, seed = parse_puzzle_code(code)
+    set_mode_parameters(mode, fill)
+    start_seeded_game(seed)
+
+def begin_game(puzzle, save=True, seed=None):
+    global initial_grid, solved_grid, grid, validation_grid, grid_cons, selected_cell, selected_digit, current_seed
+    global message, game_state, start_ticks, elapsed_time, session
+    global is_notes_mode, is_super_hint_mode, is_fast_mode, error_history_cells, hint_used_cells, scored_cells, journal
     
+    current_seed = seed
     elapsed_time = 0
     start_ticks = pygame.time.get_ticks()
-    
-    is_game_active = True; is_check_mode = False; is_notes_mode = False; is_super_hint_mode = False; is_fast_mode = False
-    error_history_cells = set(); hint_used_cells = set()
     game_state = "GAME"
+    # Правила — у партии (game_session.py), время — игровое, без пауз. Доски, журнал и множества клеток —
+    # её же объекты: рисование, повтор и продолжение партии работают с ними напрямую
+    session = GameSession(None, current_mode_type, difficulty_fill_percent, seed, puzzle,
+                          clock=lambda: get_current_game_time() / 1000, on_move=autosave_record)
+    initial_grid, solved_grid, grid, grid_cons = session.initial, session.solution, session.grid, session.cons
+    validation_grid, journal = session.validation, session.journal
+    hint_used_cells, error_history_cells, scored_cells = session.hinted, session.errors, session.scored
+    sync_session()
+    game_layers.invalidate()
+    selected_cell = None; selected_digit = 1
+    message = ""
+    is_notes_mode = False; is_super_hint_mode = False; is_fast_mode = False
+    if autosave and save:
+        autosave.start(current_mode_type, difficulty_fill_percent, (grid_size, box_w, box_h), initial_grid, solved_grid, seed)
+        autosave_record(b"S")
+
+def continue_saved_game():
+    # Продолжение без генерации: заголовок из файла, затем ходы журнала по порядку
+    global elapsed_time, start_ticks
+    data = autosave.load() if autosave else None
+    if data is None or MODE_GEOMETRY.get(data["mode"]) != data["geometry"]:
+        discard_autosave(); return
+    set_mode_parameters(data["mode"], data["fill"])
+    begin_game((data["puzzle"], data["solution"]), save=False, seed=data["seed"])
+    for kind, move, _, _, _ in data["records"]:
+        if kind == b"M":
+            cell, old, new, flags = unpack_move(move); r, c = divmod(cell, grid_size)
+            journal.record(cell, old, new, flags); grid_cons.set(r, c, new)
+            if flags & FLAG_HINT: hint_used_cells.add((r, c))
+            elif flags & FLAG_ERROR: error_history_cells.add((r, c))
+            elif new: scored_cells.add((r, c))
+        elif kind in (b"U", b"R"):
+            m = journal.undo() if kind == b"U" else journal.redo()
+            if m: grid_cons.set(*divmod(m[0], grid_size), m[1] if kind == b"U" else m[2])
+    if data["records"]: _, _, session.score, session.lives, elapsed_time = data["records"][-1]
+    start_ticks = pygame.time.get_ticks()
+    sync_session()
+    autosave.reopen()
 
 def pause_game():
     global game_state, elapsed_time
     if game_state == "GAME":
         elapsed_time += pygame.time.get_ticks() - start_ticks
         game_state = "PAUSE"
+        autosave_record(b"S")
 
 def resume_game():
     global game_state, start_ticks
@@ -255,104 +424,156 @@ def get_current_game_time():
         return elapsed_time + (pygame.time.get_ticks() - start_ticks)
     return elapsed_time
 
+def sync_session():
+    # Жизни, очки, активность и режим проверки партии — в глобальные, которые читают HUD, автосохранение и события
+    global lives, score, is_game_active, is_check_mode
+    lives, score, is_game_active, is_check_mode = session.lives, session.score, session.active, session.check_mode
+
 def attempt_place_number(r, c, val):
-    global grid, score, message, lives, is_game_active, game_state, validation_grid
     if not is_game_active or initial_grid[r][c] != 0: return
-    grid[r][c] = val
-    validation_grid[r][c] = None 
-    if val == solved_grid[r][c]:
-        points = 100
-        if (r, c) in hint_used_cells: points = 0
-        else:
-            if time.time() - cell_selection_time < 5.0: points = int(points * 1.5)
-            if (r, c) in error_history_cells: points = int(points * 0.5)
-        score += points
-        check_victory_condition()
-    else: error_history_cells.add((r, c))
+    session.place(r, c, val, time.time() - cell_selection_time)
+    check_victory_condition()
+
+def erase_cell(r, c):
+    if is_game_active: session.erase(r, c)
 
 def check_victory_condition():
-    global is_game_active, game_state, message, score
-    correct = sum(1 for r in range(grid_size) for c in range(grid_size) if grid[r][c] == solved_grid[r][c])
-    if correct == grid_size * grid_size:
-        is_game_active = False
-        final_time = get_current_game_time()
-        mins = final_time // 60000
-        mult = 0.5 if mins < 2 else (0.3 if mins < 5 else (0.1 if mins < 10 else 0.0))
-        score += int(score * mult)
-        message = f"Victory! +{int(score*mult)} Time Bonus"
+    # После каждого хода: если партия на нём закончилась (решена или кончились жизни) — экран результата
+    global message, game_state
+    was_active = is_game_active
+    sync_session()
+    if not was_active or session.active: return
+    final_time = session.elapsed_ms()
+    if session.result == "won":
+        message = f"Victory! +{session.bonus} Time Bonus"
         game_state = "VICTORY_SCREEN"
         save_game_result(final_time)
+        record_finished_game(True, final_time)
+    else:
+        message = "GAME OVER"; game_state = "GAME_OVER"
+        record_finished_game(False, final_time, lives_left=0)
+    discard_autosave()
 
 def toggle_check():
-    global is_check_mode, lives, message, is_game_active, game_state
-    if is_check_mode:
-        is_check_mode = False
-        for r in range(grid_size):
-            for c in range(grid_size): validation_grid[r][c] = None
-    else:
-        errs = 0
-        for r in range(grid_size):
-            for c in range(grid_size):
-                if grid[r][c] != 0:
-                    if grid[r][c] != solved_grid[r][c]:
-                        validation_grid[r][c] = "wrong"; errs += 1
-                    else: validation_grid[r][c] = "correct"
-        if errs > 0:
-            lives -= errs
-            message = f"Check: {errs} errors!"
-            if lives <= 0: lives = 0; is_game_active = False; game_state = "GAME_OVER"; message = "GAME OVER"
-        else: message = "Looks good!"
-        is_check_mode = True
+    global message
+    if not is_check_mode and not is_game_active: return
+    errs = session.check()
+    if session.check_mode: message = f"Check: {errs} errors!" if errs else "Looks good!"
+    check_victory_condition()
 
 def toggle_notes(): global is_notes_mode; is_notes_mode = not is_notes_mode
 def toggle_super_hint(): global is_super_hint_mode; is_super_hint_mode = not is_super_hint_mode
 def toggle_fast_mode(): global is_fast_mode; is_fast_mode = not is_fast_mode
+# Поиск подсказки на досках от LARGE_SIZE стоит десятки миллисекунд (редкая 36x36 — до ~150 мс): он идёт
+# в фоновом потоке по копии доски, а окно рисует кадры дальше. Ответ применяет главный цикл, если партия та же
+hint_worker = None
+hint_job = None   # (партия, Future)
+
 def use_random_hint():
-    global grid
+    # Следующий логический ход по доске без ошибочных цифр; если логика встала — случайная пустая клетка
+    global message, hint_worker, hint_job
+    if not is_game_active or not grid_cons.empty_cells or hint_job: return
+    if grid_size >= LARGE_SIZE:
+        if hint_worker is None: hint_worker = ThreadPoolExecutor(max_workers=1)
+        hint_job = (session, hint_worker.submit(next_hint, session.hint_board(), grid_size, box_w, box_h))
+        message = "Looking for a hint..."; return
+    _, _, text = session.hint()
+    if text: message = text
+    check_victory_condition()
+
+def poll_hint():
+    global message, hint_job
+    owner, fut = hint_job
+    if not fut.done(): return
+    hint_job = None
+    if owner is not session or not is_game_active or not grid_cons.empty_cells: return
+    found = fut.result()
+    # Пока шёл поиск, игрок мог заполнить эту клетку сам — тогда случайная пустая
+    if found and grid[found[0][0]][found[0][1]]: found = None
+    _, _, text = session.apply_hint(found)
+    message = text
+    check_victory_condition()
+
+def use_super_hint(r, c):
+    global is_super_hint_mode
     if not is_game_active: return
-    e = [(r, c) for r in range(grid_size) for c in range(grid_size) if grid[r][c] == 0]
-    if e:
-        r, c = random.choice(e)
-        grid[r][c] = solved_grid[r][c]; hint_used_cells.add((r,c)); check_victory_condition()
+    session.reveal(r, c); is_super_hint_mode = False
+    check_victory_condition()
+
+# --- UNDO / REDO / ПОВТОР ПАРТИИ ---
+def undo_move():
+    if is_game_active: session.undo()
+
+def redo_move():
+    if not is_game_active: return
+    session.redo(); check_victory_condition()
+
+# Повтор: доска откатывается к началу и ходы из журнала применяются заново по одному раз в
+# REPLAY_STEP_MS / скорость; при выходе доска и экран возвращаются к концу партии
+REPLAY_STEP_MS = 400
+replay = None
+
+def start_replay():
+    global game_state, replay, is_check_mode
+    for cell, old, _, _ in reversed(list(journal.applied())):
+        grid_cons.set(*divmod(cell, grid_size), old)
+    replay = {"i": 0, "speed": 1.0, "next": pygame.time.get_ticks() + REPLAY_STEP_MS,
+              "back": (game_state, selected_cell, message, is_check_mode)}
+    game_state = "REPLAY"; is_check_mode = False; set_replay_speed(1)
+
+def set_replay_speed(factor):
+    global message
+    replay["speed"] = min(16.0, max(0.25, replay["speed"] * factor))
+    message = f"Replay x{replay['speed']:g}  (+/- speed, any other key to stop)"
+
+def update_replay():
+    global selected_cell
+    now = pygame.time.get_ticks()
+    while replay["i"] < len(journal) and now >= replay["next"]:
+        cell, _, new, _ = journal.move(replay["i"]); replay["i"] += 1
+        selected_cell = divmod(cell, grid_size)
+        grid_cons.set(*selected_cell, new)
+        replay["next"] += REPLAY_STEP_MS / replay["speed"]
+
+def stop_replay():
+    global game_state, replay, selected_cell, message, is_check_mode
+    for i in range(replay["i"], len(journal)):
+        cell, _, new, _ = journal.move(i); grid_cons.set(*divmod(cell, grid_size), new)
+    game_state, selected_cell, message, is_check_mode = replay["back"]
+    replay = None
 
 # --- NAVIGATION ---
 def go_to_main_menu(): global game_state; game_state = "MAIN_MENU" 
 def go_to_mode_select(): global game_state; game_state = "MODE_SELECT"
 def go_to_settings(): global game_state; game_state = "SETTINGS"
-def quit_game(): pygame.quit(); sys.exit()
-def toggle_theme(): global current_theme_name; current_theme_name = "dark" if current_theme_name == "light" else "light"
+def quit_game():
+    if puzzle_pool: puzzle_pool.shutdown()
+    stats.close()
+    if autosave:
+        if is_game_active and game_state in ("GAME", "PAUSE"): autosave_record(b"S")
+        autosave.close()
+    if history: history.close()
+    pygame.quit(); sys.exit()
+def toggle_theme():
+    global current_theme_name
+    current_theme_name = "dark" if current_theme_name == "light" else "light"
+    clear_glyph_cache()
 
 # --- RENDERERS ---
 
-def format_cell_value(val):
-    if val <= 9: return str(val)
-    return chr(65 + val - 10)
-
 # --- НОВАЯ ФУНКЦИЯ ЗАСТАВКИ (ИНТРО) ---
 def draw_splash_screen():
-    global splash_start_time, game_state, splash_image
+    global splash_start_time, game_state
     
-    # 1. Инициализация таймера
+    # 1. Изображение грузится в фоне (assets.py, 80% ширины экрана); пока его нет — чёрный экран
+    splash_image = assets.splash() if assets else False
+    if splash_image is None:
+        SCREEN.fill((0, 0, 0)); return
+
+    # 2. Таймер стартует, когда картинка готова
     if splash_start_time == 0: splash_start_time = pygame.time.get_ticks()
     current_ms = pygame.time.get_ticks() - splash_start_time
 
-    # 2. Загрузка изображения (один раз)
-    if splash_image is None:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        path = os.path.join(base_dir, "assets", "images", "intro", "GDA.jpeg")
-        if os.path.exists(path):
-            try:
-                loaded = pygame.image.load(path).convert()
-                # Масштабируем до 80% ширины экрана, сохраняя пропорции
-                target_width = WIDTH * 0.8
-                scale_factor = target_width / loaded.get_width()
-                target_height = loaded.get_height() * scale_factor
-                splash_image = pygame.transform.smoothscale(loaded, (int(target_width), int(target_height)))
-            except:
-                splash_image = "ERROR" # Флаг ошибки, если не загрузилось
-        else:
-             splash_image = "ERROR"
-
     # 3. Логика тайминга и прозрачности (через черную накладку)
     # Тайминги: 1с появление, 1.5с удержание, 1с затухание
     FADE_IN_DUR = 1000
@@ -380,12 +601,12 @@ def draw_splash_screen():
     SCREEN.fill((0, 0, 0)) # Черный фон
 
     # Рисуем логотип по центру
-    if splash_image and splash_image != "ERROR":
+    if splash_image:
         img_rect = splash_image.get_rect(center=(WIDTH//2, HEIGHT//2))
         SCREEN.blit(splash_image, img_rect)
     else:
         # Запасной вариант (текст), если картинка не нашлась
-        t = FONT_M.render("GDA STUDIO", True, (255,255,255))
+        t = render_text(FONT_M, "GDA STUDIO", (255,255,255))
         SCREEN.blit(t, t.get_rect(center=(WIDTH//2, HEIGHT//2)))
 
     # Рисуем черную накладку для эффекта фейда
@@ -395,68 +616,83 @@ def draw_splash_screen():
         fade_surface.set_alpha(overlay_alpha)
         SCREEN.blit(fade_surface, (0,0))
 
+def draw_loading_screen():
+    SCREEN.fill(get_color("bg"))
+    dots = "." * (1 + (pygame.time.get_ticks() // 400) % 3)
+    t = render_text(FONT_M, f"Generating {current_mode_type} puzzle{dots}", get_color("text_main"))
+    SCREEN.blit(t, (WIDTH//2 - t.get_width()//2, HEIGHT//2 - t.get_height()//2))
+
 def draw_main_menu():
     SCREEN.fill(get_color("bg"))
-    t1 = FONT_XL.render("SUDOKU", True, get_color("text_main"))
-    t2 = FONT.render("Infinite Edition", True, get_color("text_blue"))
+    t1 = render_text(FONT_XL, "SUDOKU", get_color("text_main"))
+    t2 = render_text(FONT, "Infinite Edition", get_color("text_blue"))
     SCREEN.blit(t1, (WIDTH//2 - t1.get_width()//2, 160))
     SCREEN.blit(t2, (WIDTH//2 - t2.get_width()//2, 220))
     
-    d = load_data()
-    best = d["best_time"]
-    bt_str = f"Best: {(best//1000)//60:02}:{(best//1000)%60:02}" if best else "Best: --:--"
-    bs = BTN_FONT.render(bt_str, True, get_color("text_main"))
-    SCREEN.blit(bs, (WIDTH//2 - bs.get_width()//2, 280))
+    global best_label
+    if best_label is None:
+        best = stats.get("best_time")
+        bt_str = f"Best: {(best//1000)//60:02}:{(best//1000)%60:02}" if best else "Best: --:--"
+        best_label = render_text(BTN_FONT, bt_str, get_color("text_main"))
+    SCREEN.blit(best_label, (WIDTH//2 - best_label.get_width()//2, 280))
     
     mp = pygame.mouse.get_pos()
-    for b in [btn_start, btn_settings, btn_exit]:
+    for b in main_menu_buttons():
         b.check_hover(mp); b.draw(SCREEN)
 
+def main_menu_buttons():
+    # "Continue" появляется первым, только если есть незаконченная партия
+    btns = ([btn_continue] if autosave and autosave.available else []) + [btn_start, btn_daily, btn_settings, btn_exit]
+    # Шаг сжимается, если окно слишком низкое для пяти кнопок через 80 px
+    step = min(80, (HEIGHT - 70 - 350) // max(1, len(btns) - 1))
+    for i, b in enumerate(btns): b.rect.y = 350 + i * step
+    return btns
+
 def draw_mode_select():
     SCREEN.fill(get_color("bg"))
     overlay = pygame.Surface((WIDTH, HEIGHT)); overlay.set_alpha(100); overlay.fill((0, 0, 0))
     SCREEN.blit(overlay, (0, 0))
     
-    title = FONT_L.render("SELECT MODE", True, (255, 255, 255))
+    title = render_text(FONT_L, "SELECT MODE", (255, 255, 255))
     SCREEN.blit(title, (WIDTH//2 - title.get_width()//2, 50))
     
-    col_w = 160
     gap = 15
-    start_x = (WIDTH - (col_w * 3 + gap * 2)) // 2
-    col_h = 450
-    start_y = (HEIGHT - col_h) // 2
-    
-    modes_config = [
-        ("6x6", "Mini", [("Easy", 0.65), ("Norm", 0.55), ("Adv", 0.48), ("Hard", 0.40), ("Exp", 0.33)]),
-        ("9x9", "Classic", [("Easy", 0.52), ("Norm", 0.42), ("Adv", 0.35), ("Hard", 0.28), ("Exp", 0.22)]),
-        ("16x16", "Monster", [("Easy", 0.60), ("Norm", 0.50), ("Adv", 0.40), ("Hard", 0.32), ("Exp", 0.25)])
-    ]
+    # До трёх колонок в ряд; во втором ряду (25x25, 36x36) колонки без картинки-заглушки, чтобы всё влезло.
+    # Колонки и кнопки сложности ужимаются под окно, Back остаётся над нижним краем (см. MIN_SIZE)
+    col_w = min(160, (WIDTH - 20 - 2 * gap) // 3)
+    rows = -(-len(MODES_CONFIG) // 3)
+    img_h = 80 if rows == 1 else 0
+    col_h = min(450, HEIGHT - 200) if rows == 1 else min(340, (HEIGHT - 200 - gap * (rows - 1)) // rows)
+    start_y = (HEIGHT - col_h) // 2 if rows == 1 else 120
     
     mouse_pos = pygame.mouse.get_pos()
     
-    for i, (m_id, m_name, diffs) in enumerate(modes_config):
-        cx = start_x + i * (col_w + gap)
-        cy = start_y
+    for i, (m_id, m_name, diffs) in enumerate(MODES_CONFIG):
+        in_row = min(3, len(MODES_CONFIG) - i // 3 * 3)
+        start_x = (WIDTH - (col_w * in_row + gap * (in_row - 1))) // 2
+        cx = start_x + i % 3 * (col_w + gap)
+        cy = start_y + i // 3 * (col_h + gap)
         col_rect = pygame.Rect(cx, cy, col_w, col_h)
         pygame.draw.rect(SCREEN, get_color("lvl_col_bg"), col_rect, border_radius=15)
         pygame.draw.rect(SCREEN, get_color("lvl_col_border"), col_rect, 2, border_radius=15)
         
-        img_h = 80
-        img_rect = pygame.Rect(cx + 20, cy + 20, col_w - 40, img_h)
-        pygame.draw.rect(SCREEN, get_color("placeholder_img"), img_rect, border_radius=10)
-        t_img = BTN_FONT.render(f"IMG {m_id}", True, (255,255,255))
-        SCREEN.blit(t_img, t_img.get_rect(center=img_rect.center))
+        if img_h:
+            img_rect = pygame.Rect(cx + 20, cy + 20, col_w - 40, img_h)
+            pygame.draw.rect(SCREEN, get_color("placeholder_img"), img_rect, border_radius=10)
+            t_img = render_text(BTN_FONT, f"IMG {m_id}", (255,255,255))
+            SCREEN.blit(t_img, t_img.get_rect(center=img_rect.center))
+        top = cy + img_h + (30 if img_h else 20)
         
-        name_s = FONT_M.render(m_name, True, get_color("text_main"))
-        SCREEN.blit(name_s, (cx + col_w//2 - name_s.get_width()//2, cy + 110))
+        name_s = render_text(FONT_M, m_name, get_color("text_main"))
+        SCREEN.blit(name_s, (cx + col_w//2 - name_s.get_width()//2, top))
         
-        btn_start_y = cy + 150
-        btn_h = 45 
-        btn_gap_y = 10
+        btn_start_y = top + 40
+        step = min(55, (cy + col_h - 5 - btn_start_y) // len(diffs))
+        btn_h = min(45, step - 6)
+        btn_gap_y = step - btn_h
         
-        rank_prefix = "bronze"
-        if m_id == "9x9": rank_prefix = "silver"
-        elif m_id == "16x16": rank_prefix = "gold"
+        # Значков рангов три набора: большие режимы получают золотые
+        rank_prefix = ("bronze", "silver", "gold")[min(i, 2)]
         
         for d_idx, (d_name, d_val) in enumerate(diffs):
             by = btn_start_y + d_idx * (btn_h + btn_gap_y)
@@ -466,21 +702,7 @@ def draw_mode_select():
                 start_game_with_params(m_id, d_val)
                 return
             
-            img_name = f"{rank_prefix}{d_idx + 1}.png"
-            if img_name not in loaded_rank_images:
-                base_dir = os.path.dirname(os.path.abspath(__file__))
-                path = os.path.join(base_dir, "assets", "images", "ranks", img_name)
-                if os.path.exists(path):
-                    try:
-                        loaded = pygame.image.load(path).convert_alpha()
-                        scaled = pygame.transform.smoothscale(loaded, (120, 35))
-                        loaded_rank_images[img_name] = scaled
-                    except:
-                        loaded_rank_images[img_name] = None
-                else:
-                    loaded_rank_images[img_name] = None
-            
-            rank_surf = loaded_rank_images.get(img_name)
+            rank_surf = assets.rank(f"{rank_prefix}{d_idx + 1}") if assets else None
             
             if rank_surf:
                 ix = btn_rect.centerx - rank_surf.get_width() // 2
@@ -492,17 +714,139 @@ def draw_mode_select():
             else:
                 bg_c = get_color("btn_hover") if is_hover else get_color("btn_bg")
                 pygame.draw.rect(SCREEN, bg_c, btn_rect, border_radius=8)
-                txt_s = BTN_FONT.render(d_name, True, get_color("text_main"))
+                txt_s = render_text(BTN_FONT, d_name, get_color("text_main"))
                 SCREEN.blit(txt_s, txt_s.get_rect(center=btn_rect.center))
             
-    btn_back_mode.rect.topleft = (WIDTH//2 - 60, start_y + col_h + 20)
+    btn_back_mode.rect.topleft = (WIDTH//2 - 60, start_y + rows * (col_h + gap) + 5)
     btn_back_mode.check_hover(mouse_pos)
     btn_back_mode.draw(SCREEN)
 
-def draw_game_screen():
-    SCREEN.fill(get_color("bg"))
-    filled = sum(1 for r in range(grid_size) for c in range(grid_size) if grid[r][c] != 0)
-    prog = filled / (grid_size * grid_size)
+# --- СЛОИ ИГРОВОГО ЭКРАНА ---
+# Доска живёт в отдельной поверхности и перерисовывается по клеткам: клетка обновляется, только когда меняется
+# её значение, проверка, подсветка или заметки. Глифы заметок на 16x16 заходят на соседние клетки, поэтому
+# изменённая клетка перерисовывает и область каждого соседа (в исходном порядке отрисовки, с обрезкой).
+# Линии сетки — кэшированный статический слой. На экран уходят только изменившиеся прямоугольники.
+BOARD_MARGIN = 3
+CHECK_COLORS = (None, "correct", "wrong")   # цвет фона по флагу validation_grid
+NOTE_MIN_PX = 6
+LINES_KEY = (255, 0, 255)
+
+class GameScreenLayers:
+    def __init__(self):
+        self.geometry = None
+        self.screen_valid = False
+
+    def invalidate(self): self.geometry = None; self.screen_valid = False
+
+    def build(self, geometry, layout):
+        m = BOARD_MARGIN
+        self.geometry = geometry
+        self.cell_s = cell_s = layout.cell_s
+        self.origin = (layout.grid_x - m, layout.grid_y - m)
+        side = cell_s * grid_size + 2 * m + 1
+        self.board = pygame.Surface((side, side)).convert()
+        self.lines = pygame.Surface((side, side)).convert()
+        self.lines.fill(LINES_KEY); self.lines.set_colorkey(LINES_KEY)
+        lc = get_color("grid_line"); grid_h = cell_s * grid_size
+        for i in range(grid_size + 1):
+            th = 3 if i % box_w == 0 else 1
+            pygame.draw.line(self.lines, lc, (m + i*cell_s, m), (m + i*cell_s, m + grid_h), th)
+            th_h = 3 if i % box_h == 0 else 1
+            pygame.draw.line(self.lines, lc, (m, m + i*cell_s), (m + grid_size*cell_s, m + i*cell_s), th_h)
+        self.states = [None] * (grid_size * grid_size)
+        self.hud_key = self.panel_key = None
+        self.screen_valid = False
+
+    def cell_states(self):
+        out = []
+        sel = selected_cell
+        n = grid_size
+        for r in range(n):
+            # Срезы bytearray — короткие копии строк, индексация по ним быстрее окон memoryview
+            lo = r * n; row, vrow, irow = grid.cells[lo:lo + n], validation_grid.cells[lo:lo + n], initial_grid.cells[lo:lo + n]
+            for c in range(n):
+                v = row[c]
+                if is_check_mode: bg = CHECK_COLORS[vrow[c]]
+                elif selected_digit and v == selected_digit: bg = "highlight"
+                else: bg = None
+                mark = 0 if sel != (r, c) else (2 if is_super_hint_mode else 1)
+                notes = grid_cons.candidate_mask(r, c) if is_notes_mode and v == 0 else 0
+                out.append((v, bool(irow[c]), bg, mark, notes))
+        return out
+
+    def clip_rect(self, r, c):
+        m, cs = BOARD_MARGIN, self.cell_s; side = self.board.get_width()
+        x0 = 0 if c == 0 else m + c*cs; x1 = side if c == grid_size - 1 else m + (c + 1)*cs
+        y0 = 0 if r == 0 else m + r*cs; y1 = side if r == grid_size - 1 else m + (r + 1)*cs
+        return pygame.Rect(x0, y0, x1 - x0, y1 - y0)
+
+    def update_board(self):
+        # Возвращает области доски (в её координатах), которые изменились
+        states = self.cell_states()
+        changed = sum(1 for st, old in zip(states, self.states) if st != old)
+        if changed * 4 > len(states):
+            # Первый кадр после сборки слоя или смена режима (заметки, проверка): вся доска одним проходом
+            self.states = states
+            clip = self.board.get_rect()
+            self.paint(clip, [(r, c) for r in range(grid_size) for c in range(grid_size)], states)
+            return [clip]
+        dirty = set()
+        for idx, st in enumerate(states):
+            if st != self.states[idx]:
+                r, c = divmod(idx, grid_size)
+                for i in range(max(0, r - 1), min(grid_size, r + 2)):
+                    for j in range(max(0, c - 1), min(grid_size, c + 2)): dirty.add((i, j))
+        self.states = states
+        clips = []
+        for r, c in sorted(dirty):
+            clip = self.clip_rect(r, c)
+            around = [(i, j) for i in range(max(0, r - 1), min(grid_size, r + 2)) for j in range(max(0, c - 1), min(grid_size, c + 2))]
+            self.paint(clip, around, states)
+            clips.append(clip)
+        return clips
+
+    def paint(self, clip, around, states):
+        surf, m, cs = self.board, BOARD_MARGIN, self.cell_s
+        surf.set_clip(clip)
+        surf.fill(get_color("bg"), clip)
+        note_glyphs = digit_glyphs(max(8, int(cs / 3.5)), get_color("text_candidate"))
+        for i, j in around:
+            v, given, bg, mark, notes = states[i * grid_size + j]
+            rect = pygame.Rect(m + j*cs, m + i*cs, cs, cs)
+            pygame.draw.rect(surf, get_color("cell_bg"), rect)
+            if bg: pygame.draw.rect(surf, get_color(bg), rect)
+            if mark:
+                pygame.draw.rect(surf, get_color("selected"), rect)
+                if mark == 2: pygame.draw.rect(surf, get_color("btn_active_tool"), rect, 3)
+            if notes:
+                cw = rect.width / box_w
+                ch = rect.height / box_h
+                if cw < NOTE_MIN_PX:
+                    # На 25x25 и 36x36 места под каждую заметку нет — показываем, сколько осталось кандидатов
+                    txt = render_text(get_font("Arial", max(8, int(cs * 0.45))), str(bin(notes).count("1")), get_color("text_candidate"))
+                    surf.blit(txt, txt.get_rect(center=rect.center)); notes = 0
+                while notes:
+                    low = notes & -notes; notes ^= low
+                    cand = low.bit_length() - 1; idx = cand - 1
+                    cx = rect.x + (idx % box_w) * cw + cw/2
+                    cy = rect.y + (idx // box_w) * ch + ch/2
+                    txt = note_glyphs[cand]
+                    surf.blit(txt, txt.get_rect(center=(cx, cy)))
+        surf.blit(self.lines, clip.topleft, clip)
+        val_font_size = int(cs * 0.6)
+        main_glyphs = digit_glyphs(val_font_size, get_color("text_main"))
+        given_glyphs = digit_glyphs(val_font_size, get_color("text_blue"))
+        for i, j in around:
+            v, given = states[i * grid_size + j][:2]
+            if v:
+                txt = (given_glyphs if given else main_glyphs)[v]
+                surf.blit(txt, txt.get_rect(center=(m + j*cs + cs//2, m + i*cs + cs//2)))
+        surf.set_clip(None)
+
+game_layers = GameScreenLayers()
+
+def draw_hud():
+    prog = grid_cons.filled / (grid_size * grid_size)
     pygame.draw.rect(SCREEN, get_color("bar_bg"), (20, 15, WIDTH-40, 12), border_radius=6)
     if prog > 0:
         sc, ec = (230, 80, 80), (80, 230, 80)
@@ -513,252 +857,358 @@ def draw_game_screen():
     sec, mn = (ct//1000)%60, (ct//1000)//60
     t_str = f"{mn:02}:{sec:02}"
     col = get_color("text_main")
-    SCREEN.blit(BTN_FONT.render(f"Time: {t_str}", True, col), (20, 40))
-    SCREEN.blit(BTN_FONT.render(f"Score: {score}", True, col), (200, 40))
+    SCREEN.blit(render_text(BTN_FONT, f"Time: {t_str}", col), (20, 40))
+    SCREEN.blit(render_text(BTN_FONT, f"Score: {score}", col), (200, 40))
 
-    avail_w = WIDTH - 20
-    cell_s = avail_w // grid_size
-    grid_y = 100
-    grid_h = cell_s * grid_size
-    
     lx = WIDTH - 20 - (3*30)
     ly = 40
     for i in range(3):
         c = get_color("heart_red") if i < lives else get_color("heart_black")
-        SCREEN.blit(ICON_FONT.render("❤", True, c), (lx + i*30, ly - 10))
-    
-    for r in range(grid_size):
-        for c in range(grid_size):
-            rect = pygame.Rect(10 + c*cell_s, grid_y + r*cell_s, cell_s, cell_s)
-            pygame.draw.rect(SCREEN, get_color("cell_bg"), rect)
-            if is_check_mode:
-                if validation_grid[r][c] == "correct": pygame.draw.rect(SCREEN, get_color("correct"), rect)
-                elif validation_grid[r][c] == "wrong": pygame.draw.rect(SCREEN, get_color("wrong"), rect)
-            elif selected_digit and grid[r][c] == selected_digit:
-                pygame.draw.rect(SCREEN, get_color("highlight"), rect)
-            if selected_cell == (r, c):
-                pygame.draw.rect(SCREEN, get_color("selected"), rect)
-                if is_super_hint_mode: pygame.draw.rect(SCREEN, get_color("btn_active_tool"), rect, 3)
-            
-            if is_notes_mode and grid[r][c] == 0:
-                cands = get_candidates(grid, r, c)
-                if cands:
-                    note_font_size = max(8, int(cell_s / 3.5)) 
-                    NOTE_FONT = pygame.font.SysFont("Arial", note_font_size)
-                    cols_in_cell = box_w 
-                    rows_in_cell = box_h 
-                    cw = rect.width / cols_in_cell
-                    ch = rect.height / rows_in_cell
-                    for cand in cands:
-                        idx = cand - 1
-                        cx_idx = idx % cols_in_cell
-                        cy_idx = idx // cols_in_cell
-                        cx = rect.x + cx_idx * cw + cw/2
-                        cy = rect.y + cy_idx * ch + ch/2
-                        txt = NOTE_FONT.render(format_cell_value(cand), True, get_color("text_candidate"))
-                        SCREEN.blit(txt, txt.get_rect(center=(cx, cy)))
-
-    for i in range(grid_size + 1):
-        th = 3 if i % box_w == 0 else 1
-        lc = get_color("grid_line")
-        pygame.draw.line(SCREEN, lc, (10 + i*cell_s, grid_y), (10 + i*cell_s, grid_y + grid_h), th)
-        th_h = 3 if i % box_h == 0 else 1
-        pygame.draw.line(SCREEN, lc, (10, grid_y + i*cell_s), (10 + grid_size*cell_s, grid_y + i*cell_s), th_h)
-
-    val_font_size = int(cell_s * 0.6)
-    VAL_FONT = pygame.font.SysFont("Arial", val_font_size)
-    for r in range(grid_size):
-        for c in range(grid_size):
-            if grid[r][c] != 0:
-                c_col = get_color("text_main") if not initial_grid[r][c] else get_color("text_blue")
-                txt = VAL_FONT.render(format_cell_value(grid[r][c]), True, c_col)
-                SCREEN.blit(txt, txt.get_rect(center=(10 + c*cell_s + cell_s//2, grid_y + r*cell_s + cell_s//2)))
-
-    tool_y = grid_y + grid_h + 15
-    cx = WIDTH // 2
-    btn_tool_notes.rect.topleft = (cx - 130, tool_y)
-    btn_tool_bulb.rect.topleft = (cx - 60, tool_y)
-    btn_tool_super.rect.topleft = (cx + 10, tool_y)
-    btn_tool_fast.rect.topleft = (cx + 80, tool_y)
-    
-    btn_tool_notes.active_override_color = get_color("btn_active_tool") if is_notes_mode else None
-    btn_tool_super.active_override_color = get_color("btn_active_tool") if is_super_hint_mode else None
-    btn_tool_fast.active_override_color = get_color("btn_active_tool") if is_fast_mode else None
-    
-    mp = pygame.mouse.get_pos()
-    for b in [btn_tool_notes, btn_tool_bulb, btn_tool_super, btn_tool_fast]:
-        b.check_hover(mp); b.draw(SCREEN)
+        SCREEN.blit(render_text(ICON_FONT, "❤", c), (lx + i*30, ly - 10))
 
-    draw_numpad(SCREEN, tool_y + 60)
+def draw_panel(layout):
+    for b in [btn_tool_notes, btn_tool_bulb, btn_tool_super, btn_tool_fast]: b.draw(SCREEN)
+
+    draw_numpad(SCREEN, layout)
 
-    btn_check.active_override_color = get_color("btn_checked") if is_check_mode else None
-    btn_check.check_hover(mp); btn_menu_game.check_hover(mp)
     btn_check.draw(SCREEN); btn_menu_game.draw(SCREEN)
 
     if message:
-        m_img = SMALL_FONT.render(message, True, get_color("text_main"))
-        SCREEN.blit(m_img, (WIDTH//2 - m_img.get_width()//2, HEIGHT - 110))
-
-    if game_state == "GAME_OVER": draw_overlay("GAME OVER", "No lives left!")
-    if game_state == "VICTORY_SCREEN": draw_overlay("VICTORY!", f"Score: {score}")
-
-def draw_numpad(screen, y):
-    counts = {i: grid_size for i in range(1, max_digit+1)}
-    for r in grid:
-        for val in r:
-            if val in counts: counts[val] -= 1
-    rows = 1 if grid_size <= 9 else 2
-    cols = grid_size if grid_size <= 9 else 8
-    bw = (WIDTH - 20) // cols
-    bh = 60
+        m_img = render_text(SMALL_FONT, message, get_color("text_main"))
+        SCREEN.blit(m_img, (WIDTH//2 - m_img.get_width()//2, layout.message_y))
+
+def draw_game_screen():
+    # Возвращает список изменившихся прямоугольников экрана для pygame.display.update
+    L = game_layers
+    layout = game_layout()
+    geometry = (layout.key, box_w, box_h, current_theme_name)
+    if L.geometry != geometry: L.build(geometry, layout)
+    full = not L.screen_valid
+    dirty = []
+    if full: SCREEN.fill(get_color("bg"))
+
+    hud_rect = pygame.Rect(0, 0, WIDTH, layout.grid_y - BOARD_MARGIN)
+    hud_key = (grid_cons.filled, get_current_game_time() // 1000, score, lives)
+    if full or hud_key != L.hud_key:
+        L.hud_key = hud_key
+        if not full: SCREEN.fill(get_color("bg"), hud_rect)
+        draw_hud(); dirty.append(hud_rect)
+
+    ox, oy = L.origin
+    clips = L.update_board()
+    if full: SCREEN.blit(L.board, L.origin)
+    else:
+        for clip in clips:
+            SCREEN.blit(L.board, (ox + clip.x, oy + clip.y), clip); dirty.append(clip.move(ox, oy))
+
+    btn_tool_notes.active_override_color = get_color("btn_active_tool") if is_notes_mode else None
+    btn_tool_super.active_override_color = get_color("btn_active_tool") if is_super_hint_mode else None
+    btn_tool_fast.active_override_color = get_color("btn_active_tool") if is_fast_mode else None
+    btn_check.active_override_color = get_color("btn_checked") if is_check_mode else None
+    
+    mp = pygame.mouse.get_pos()
+    panel_btns = [btn_tool_notes, btn_tool_bulb, btn_tool_super, btn_tool_fast, btn_check, btn_menu_game]
+    for b in panel_btns: b.check_hover(mp)
+    panel_top = oy + L.board.get_height()
+    panel_rect = pygame.Rect(0, panel_top, WIDTH, HEIGHT - panel_top)
+    panel_key = (tuple((b.text, b.hovered, b.pressed, b.active_override_color) for b in panel_btns),
+                 tuple(grid_cons.digit_counts), selected_digit, message)
+    if full or panel_key != L.panel_key:
+        L.panel_key = panel_key
+        if not full: SCREEN.fill(get_color("bg"), panel_rect)
+        draw_panel(layout); dirty.append(panel_rect)
+
+    L.screen_valid = True
+    if full: dirty = [SCREEN.get_rect()]
+    if game_state in ("GAME_OVER", "VICTORY_SCREEN"):
+        if game_state == "GAME_OVER": draw_overlay("GAME OVER", "No lives left!")
+        else: draw_overlay("VICTORY!", f"Score: {score}")
+        L.screen_valid = False; dirty = [SCREEN.get_rect()]
+    return dirty
+
+# Раскладка игрового экрана (layout.py) пересчитывается только при смене размера окна или доски;
+# кнопки инструментов и Check / Menu ставятся на место тогда же, а не в каждом кадре
+layout = None
+
+def game_layout():
+    global layout
+    if layout is None or layout.key != (WIDTH, HEIGHT, grid_size):
+        layout = Layout(WIDTH, HEIGHT, grid_size)
+        for b, rect in zip([btn_tool_notes, btn_tool_bulb, btn_tool_super, btn_tool_fast], layout.tools): b.rect = pygame.Rect(rect)
+        btn_check.rect = pygame.Rect(layout.check); btn_menu_game.rect = pygame.Rect(layout.menu)
+    return layout
+
+def draw_numpad(screen, layout):
+    counts = {i: grid_cons.remaining(i) for i in range(1, max_digit+1)}
+    bh = layout.key_h
     for i in range(1, max_digit + 1):
-        row_idx = (i - 1) // 8 if grid_size == 16 else 0
-        col_idx = (i - 1) % 8 if grid_size == 16 else (i - 1)
-        cx = 10 + col_idx * bw
-        cy = y + row_idx * (bh + 5)
-        outer = pygame.Rect(cx + 2, cy, bw - 4, bh)
+        outer = pygame.Rect(layout.key_rect(i))
         if selected_digit == i: pygame.draw.rect(screen, get_color("box_selected"), outer.inflate(4,4), border_radius=8)
         pygame.draw.rect(screen, get_color("box_outer"), outer, border_radius=6)
         t_val = format_cell_value(i)
         t_col = get_color("text_main")
         if counts[i] == 0: t_col = get_color("grid_line")
         f = BTN_FONT if grid_size <= 9 else SMALL_FONT
-        ts = f.render(t_val, True, t_col)
-        screen.blit(ts, ts.get_rect(center=(outer.centerx, outer.centery - 8)))
+        ts = render_text(f, t_val, t_col)
+        screen.blit(ts, ts.get_rect(center=(outer.centerx, outer.top + bh * 11 // 30)))
         if counts[i] > 0:
-            rs = CANDIDATE_FONT.render(str(counts[i]), True, get_color("text_blue"))
-            screen.blit(rs, rs.get_rect(center=(outer.centerx, outer.bottom - 10)))
+            rs = render_text(CANDIDATE_FONT, str(counts[i]), get_color("text_blue"))
+            screen.blit(rs, rs.get_rect(center=(outer.centerx, outer.bottom - max(8, bh // 6))))
 
 def draw_overlay(t1_s, t2_s):
     ov = pygame.Surface((WIDTH, HEIGHT)); ov.set_alpha(180); ov.fill((0,0,0))
     SCREEN.blit(ov, (0,0))
-    t1 = FONT_XL.render(t1_s, True, (255, 80, 80))
-    t2 = FONT.render(t2_s, True, (255, 255, 255))
+    t1 = render_text(FONT_XL, t1_s, (255, 80, 80))
+    t2 = render_text(FONT, t2_s, (255, 255, 255))
     SCREEN.blit(t1, (WIDTH//2 - t1.get_width()//2, HEIGHT//2 - 80))
     SCREEN.blit(t2, (WIDTH//2 - t2.get_width()//2, HEIGHT//2 - 20))
     mp = pygame.mouse.get_pos()
-    for b in [btn_restart, btn_menu_over]: b.check_hover(mp); b.draw(SCREEN)
+    for b in [btn_restart, btn_menu_over, btn_replay]: b.check_hover(mp); b.draw(SCREEN)
 
 def draw_pause_menu():
     overlay = pygame.Surface((WIDTH, HEIGHT))
     overlay.set_alpha(180)
     overlay.fill((0, 0, 0))
     SCREEN.blit(overlay, (0, 0))
-    t = FONT_XL.render("PAUSED", True, (255, 255, 255))
+    t = render_text(FONT_XL, "PAUSED", (255, 255, 255))
     SCREEN.blit(t, (WIDTH//2 - t.get_width()//2, 150))
     mp = pygame.mouse.get_pos()
     for b in [btn_pause_resume, btn_pause_restart, btn_pause_main, btn_pause_exit]:
         b.check_hover(mp)
         b.draw(SCREEN)
+    if current_seed is not None:
+        t = render_text(SMALL_FONT, f"Code: {puzzle_code(current_mode_type, difficulty_fill_percent, current_seed)}", (255, 255, 255))
+        SCREEN.blit(t, (WIDTH//2 - t.get_width()//2, 630))
 
 def draw_settings():
     SCREEN.fill(get_color("bg"))
-    t = FONT_L.render("SETTINGS", True, get_color("text_main"))
+    t = render_text(FONT_L, "SETTINGS", get_color("text_main"))
     SCREEN.blit(t, (WIDTH//2 - t.get_width()//2, 180))
     btn_theme.text = f"Theme: {current_theme_name.capitalize()}"
     mp = pygame.mouse.get_pos()
     for b in [btn_theme, btn_back_set]: b.check_hover(mp); b.draw(SCREEN)
 
 # --- BUTTONS ---
-btn_start = Button("Start Game", WIDTH//2 - 100, 350, 200, 60, go_to_mode_select) 
-btn_settings = Button("Settings", WIDTH//2 - 100, 430, 200, 60, go_to_settings)
-btn_exit = Button("Exit", WIDTH//2 - 100, 510, 200, 60, quit_game)
-
-btn_restart = Button("Try Again", WIDTH//2 - 110, HEIGHT//2 + 60, 220, 60, start_new_game)
-btn_menu_over = Button("Modes", WIDTH//2 - 110, HEIGHT//2 + 140, 220, 60, go_to_mode_select)
-
-btn_pause_resume = Button("Resume", WIDTH//2 - 100, 300, 200, 60, resume_game)
-btn_pause_restart = Button("Restart", WIDTH//2 - 100, 380, 200, 60, start_new_game)
-btn_pause_main = Button("Main Menu", WIDTH//2 - 100, 460, 200, 60, go_to_main_menu)
-btn_pause_exit = Button("Exit", WIDTH//2 - 100, 540, 200, 60, quit_game)
-
-btn_theme = Button("Theme: Light", WIDTH//2 - 120, 300, 240, 60, toggle_theme)
-btn_back_set = Button("Back", WIDTH//2 - 100, 460, 200, 60, go_to_main_menu)
-btn_back_mode = Button("Back", 0, 0, 120, 40, go_to_main_menu) 
-
-btn_check = Button("Check", WIDTH - 130, HEIGHT - 70, 110, 50, toggle_check)
-btn_menu_game = Button("Menu", 20, HEIGHT - 70, 110, 50, pause_game) 
-
-btn_tool_notes = Button("★", 0, 0, 60, 50, toggle_notes, icon=True)
-btn_tool_bulb = Button("💡", 0, 0, 60, 50, use_random_hint, icon=True)
-btn_tool_super = Button("🎯", 0, 0, 60, 50, toggle_super_hint, icon=True)
-btn_tool_fast  = Button("⚡", 0, 0, 60, 50, toggle_fast_mode, icon=True)
+# Создаются в init_ui() вместе со шрифтами
+btn_continue = btn_start = btn_daily = btn_settings = btn_exit = btn_restart = btn_menu_over = btn_replay = None
+btn_pause_resume = btn_pause_restart = btn_pause_main = btn_pause_exit = None
+btn_theme = btn_back_set = btn_back_mode = btn_check = btn_menu_game = None
+btn_tool_notes = btn_tool_bulb = btn_tool_super = btn_tool_fast = None
+
+def create_buttons():
+    global btn_continue, btn_start, btn_daily, btn_settings, btn_exit, btn_restart, btn_menu_over, btn_replay, btn_pause_resume
+    global btn_pause_restart, btn_pause_main, btn_pause_exit, btn_theme, btn_back_set, btn_back_mode
+    global btn_check, btn_menu_game, btn_tool_notes, btn_tool_bulb, btn_tool_super, btn_tool_fast, layout
+    layout = None   # новые кнопки игрового экрана расставит game_layout
+    btn_continue = Button("Continue", WIDTH//2 - 100, 350, 200, 60, continue_saved_game)
+    btn_start = Button("Start Game", WIDTH//2 - 100, 350, 200, 60, go_to_mode_select) 
+    btn_daily = Button("Daily", WIDTH//2 - 100, 430, 200, 60, start_daily_game)
+    btn_settings = Button("Settings", WIDTH//2 - 100, 430, 200, 60, go_to_settings)
+    btn_exit = Button("Exit", WIDTH//2 - 100, 510, 200, 60, quit_game)
+
+    btn_restart = Button("Try Again", WIDTH//2 - 110, HEIGHT//2 + 60, 220, 60, start_new_game)
+    btn_menu_over = Button("Modes", WIDTH//2 - 110, HEIGHT//2 + 140, 220, 60, go_to_mode_select)
+    btn_replay = Button("Replay", WIDTH//2 - 110, HEIGHT//2 + 220, 220, 60, start_replay)
+
+    btn_pause_resume = Button("Resume", WIDTH//2 - 100, 300, 200, 60, resume_game)
+    btn_pause_restart = Button("Restart", WIDTH//2 - 100, 380, 200, 60, restart_game)
+    btn_pause_main = Button("Main Menu", WIDTH//2 - 100, 460, 200, 60, go_to_main_menu)
+    btn_pause_exit = Button("Exit", WIDTH//2 - 100, 540, 200, 60, quit_game)
+
+    btn_theme = Button("Theme: Light", WIDTH//2 - 120, 300, 240, 60, toggle_theme)
+    btn_back_set = Button("Back", WIDTH//2 - 100, 460, 200, 60, go_to_main_menu)
+    btn_back_mode = Button("Back", 0, 0, 120, 40, go_to_main_menu) 
+
+    btn_check = Button("Check", WIDTH - 130, HEIGHT - 70, 110, 50, toggle_check)
+    btn_menu_game = Button("Menu", 20, HEIGHT - 70, 110, 50, pause_game) 
+
+    btn_tool_notes = Button("★", 0, 0, 60, 50, toggle_notes, icon=True)
+    btn_tool_bulb = Button("💡", 0, 0, 60, 50, use_random_hint, icon=True)
+    btn_tool_super = Button("🎯", 0, 0, 60, 50, toggle_super_hint, icon=True)
+    btn_tool_fast  = Button("⚡", 0, 0, 60, 50, toggle_fast_mode, icon=True)
+
+def init_ui():
+    # Всё, что требует pygame.init: окно, шрифты, кнопки
+    global SCREEN, FONT_XL, FONT_L, FONT_M, FONT, SMALL_FONT, CANDIDATE_FONT, BTN_FONT, ICON_FONT
+    pygame.init()
+    SCREEN = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
+    pygame.display.set_caption("Sudoku: Infinite Edition")
+    FONT_XL = get_font("Arial", 60, bold=True)
+    FONT_L = get_font("Arial", 45, bold=True)
+    FONT_M = get_font("Arial", 24, bold=True)
+    FONT = get_font("Arial", 35)
+    SMALL_FONT = get_font("Arial", 20)
+    CANDIDATE_FONT = get_font("Arial", 12, bold=True)
+    BTN_FONT = get_font("Arial", 20, bold=True)
+    ICON_FONT = get_font("Segoe UI Symbol", 28)
+    create_buttons()
+
+def resize_window(w, h):
+    # Один пересчёт на изменение размера: кнопки меню заново от новой середины, раскладка и слои игры — при первом кадре
+    global SCREEN, WIDTH, HEIGHT
+    size = (max(MIN_SIZE[0], w), max(MIN_SIZE[1], h))
+    if size == (WIDTH, HEIGHT): return
+    WIDTH, HEIGHT = size
+    SCREEN = pygame.display.set_mode(size, pygame.RESIZABLE)
+    create_buttons()
+    game_layers.invalidate()
 
 # --- MAIN ---
-def main():
-    global selected_cell, selected_digit, is_game_active, elapsed_time, cell_selection_time
-    global is_super_hint_mode, is_fast_mode
+def next_frame_timeout():
+    # None — анимация, рисуем с полной частотой; иначе сколько мс можно спать до следующей нужной перерисовки
+    if FRAME_POLICY["mode"] == "fixed" or game_state in ANIMATED_STATES: return None
+    if game_state == "GAME" and is_game_active: return 1000 - get_current_game_time() % 1000
+    return FRAME_POLICY["idle_timeout_ms"]
+
+def wait_for_events(clock):
+    timeout = next_frame_timeout()
+    if timeout is None:
+        clock.tick(FRAME_POLICY["fps"]); return pygame.event.get()
+    first = pygame.event.wait(max(1, timeout))
+    clock.tick()
+    return ([first] if first.type != pygame.NOEVENT else []) + pygame.event.get()
+
+# --- ПРОФИЛИРОВАНИЕ ---
+# F3 — оверлей со временем по функциям за кадр и счётчиками (рендер шрифтов, узлы решателя), F4 — выгрузка
+# последних кадров в PROFILE_FILE.json и PROFILE_FILE.trace.json (chrome://tracing, Perfetto).
+# Пока профилировщик выключен, функции не обёрнуты (см. profiler.py).
+PROFILE_FILE = "sudoku_profile"
+PROFILE_TOP = 10
+_this = sys.modules[__name__]
+profiler.instrument(_this, ["draw_splash_screen", "draw_loading_screen", "draw_main_menu", "draw_mode_select",
+                            "draw_settings", "draw_game_screen", "draw_hud", "draw_panel", "draw_numpad", "draw_overlay",
+                            "draw_pause_menu", "generate_puzzle", "generate_rated",
+                            "begin_game", "poll_pending_game", "start_seeded_game", "use_random_hint", "poll_hint", "check_victory_condition", "update_replay",
+                            "autosave_tick"])
+profiler.instrument(GameScreenLayers, ["cell_states", "update_board", "paint"])
+# Внутри генерации и подсказок: движок и логический решатель зовут эти функции через свои модули
+profiler.instrument(sudoku_engine, ["generate_puzzle", "pattern_solution", "dig_unique"], "engine.")
+profiler.instrument(logic_solver, ["rate", "solve_steps"], "logic.")
+
+def toggle_profiler():
+    profiler.toggle(); game_layers.screen_valid = False
+
+def export_profile():
+    global message
+    if not profiler.enabled: return
+    profiler.export_json(PROFILE_FILE + ".json"); profiler.export_trace(PROFILE_FILE + ".trace.json")
+    message = f"Profile saved: {PROFILE_FILE}.json, {PROFILE_FILE}.trace.json"
+
+def draw_profiler_overlay(dirty):
+    # Непрозрачная панель сверху (под ней экран перерисовывается не каждый кадр). Текст — прямым font.render,
+    # мимо кэша глифов, чтобы оверлей не попадал в собственные счётчики.
+    f = get_font("Arial", 13)
+    last, avg, peak = profiler.frame_stats()
+    lines = [f"frame {last:6.2f} ms   avg {avg:6.2f}   max {peak:6.2f}   ({len(profiler.frames)} frames)"]
+    top = sorted(profiler.summary().items(), key=lambda kv: -kv[1][2])[:PROFILE_TOP]
+    lines += [f"{name:<24} {per_frame:7.2f} ms/frame   max {mx:7.2f}" for name, (_, _, per_frame, mx) in top]
+    counts = profiler.counters()
+    lines.append("  ".join(f"{k} {v}" for k, v in sorted(counts.items())) or "no font renders or solver runs")
+    c = puzzle_cache.stats()
+    lines.append(f"puzzle cache {c['size']}/{c['maxsize']}   hits {c['hits']}   misses {c['misses']}")
+    lines.append("F3 hide   F4 save JSON + trace")
+    rect = pygame.Rect(5, 5, WIDTH - 10, 16 * len(lines) + 8)
+    pygame.draw.rect(SCREEN, (20, 20, 24), rect)
+    for i, line in enumerate(lines): SCREEN.blit(f.render(line, True, (230, 230, 230)), (rect.x + 6, rect.y + 4 + i * 16))
+    if dirty is not None: dirty.append(rect)
+    return dirty
+
+def main(argv=None):
+    # python sudoku.py [код головоломки] — сразу открыть головоломку по коду из меню паузы
+    global selected_cell, selected_digit, cell_selection_time, puzzle_pool, puzzle_bank, history, assets, autosave
+    argv = sys.argv[1:] if argv is None else argv
+    puzzle_bank = open_bank(BANK_FILE)
+    stats.load()
+    # Пул — раньше окна и потока ассетов: процесс, от которого порождаются воркеры, стартует без SDL и лишних потоков
+    keys = [(m_id, d_val) for m_id, _, diffs in MODES_CONFIG for _, d_val in diffs]
+    puzzle_pool = PuzzlePool([k for k in keys if not (puzzle_bank and puzzle_bank.count(*k))])
+    puzzle_pool.start()
+    init_ui()
+    assets = AssetManager(os.path.dirname(os.path.abspath(__file__)), WIDTH * 0.8)
+    assets.start()
+    history = GameHistory(HISTORY_FILE)
+    autosave = GameSave(SAVE_FILE)
+    if argv:
+        try: start_code_game(argv[0])
+        except ValueError: print(f"Bad puzzle code: {argv[0]}")
     clock = pygame.time.Clock()
     running = True
     while running:
-        events = pygame.event.get()
+        events = wait_for_events(clock)
+        if profiler.enabled: profiler.begin_frame()
         for event in events:
             if event.type == pygame.QUIT: running = False
+            if event.type == pygame.VIDEORESIZE: resize_window(*event.size)
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3: toggle_profiler()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4: export_profile()
             active_btns = []
             
-            if game_state == "MAIN_MENU": active_btns = [btn_start, btn_settings, btn_exit]
+            if game_state == "MAIN_MENU": active_btns = main_menu_buttons()
             elif game_state == "MODE_SELECT": active_btns = [btn_back_mode] 
             elif game_state == "SETTINGS": active_btns = [btn_theme, btn_back_set]
             elif game_state == "GAME": active_btns = [btn_check, btn_menu_game, btn_tool_notes, btn_tool_bulb, btn_tool_super, btn_tool_fast]
             elif game_state == "PAUSE": active_btns = [btn_pause_resume, btn_pause_restart, btn_pause_main, btn_pause_exit]
-            elif game_state in ["GAME_OVER", "VICTORY_SCREEN"]: active_btns = [btn_restart, btn_menu_over]
+            elif game_state in ["GAME_OVER", "VICTORY_SCREEN"]: active_btns = [btn_restart, btn_menu_over, btn_replay]
             
             for b in active_btns: b.handle_event(event)
             
             if game_state == "GAME" and is_game_active and event.type == pygame.MOUSEBUTTONDOWN:
-                x, y = event.pos
-                avail_w = WIDTH - 20
-                cell_s = avail_w // grid_size
-                grid_y = 100
-                grid_h = cell_s * grid_size
-                if 10 <= x < 10 + grid_size*cell_s and grid_y <= y < grid_y + grid_h:
-                    c = (x - 10) // cell_s
-                    r = (y - grid_y) // cell_s
-                    if is_super_hint_mode:
-                        grid[r][c] = solved_grid[r][c]; hint_used_cells.add((r,c))
-                        is_super_hint_mode = False; check_victory_condition()
+                layout = game_layout()
+                cell = layout.cell_at(*event.pos)
+                if cell:
+                    r, c = cell
+                    if is_super_hint_mode: use_super_hint(r, c)
                     elif is_fast_mode and selected_digit: attempt_place_number(r, c, selected_digit)
                     else:
                         selected_cell = (r, c); cell_selection_time = time.time()
                         if grid[r][c] != 0: selected_digit = grid[r][c]
-                tool_y = grid_y + grid_h + 15; pad_y = tool_y + 60
-                cols = grid_size if grid_size <= 9 else 8
-                bw = (WIDTH - 20) // cols; bh = 60
-                if pad_y <= y < HEIGHT - 80:
-                    rel_y = y - pad_y
-                    row_idx = rel_y // (bh + 5); col_idx = (x - 10) // bw
-                    idx = -1
-                    if grid_size <= 9:
-                        if row_idx == 0 and 0 <= col_idx < grid_size: idx = col_idx + 1
+                idx = layout.key_at(*event.pos)
+                if idx:
+                    if is_fast_mode: selected_digit = idx
                     else:
-                        if 0 <= row_idx <= 1 and 0 <= col_idx < 8: idx = row_idx * 8 + col_idx + 1
-                    if 1 <= idx <= max_digit:
-                        if is_fast_mode: selected_digit = idx
-                        else:
-                            if selected_cell: r, c = selected_cell; attempt_place_number(r, c, idx)
-                            else: selected_digit = idx
+                        if selected_cell: r, c = selected_cell; attempt_place_number(r, c, idx)
+                        else: selected_digit = idx
 
             if game_state == "GAME" and event.type == pygame.KEYDOWN and selected_cell:
                 r, c = selected_cell
                 if initial_grid[r][c] == 0:
-                    val = -1
-                    if event.key in range(pygame.K_1, pygame.K_9 + 1): val = int(event.unicode)
-                    if val != -1: attempt_place_number(r, c, val)
-                    if event.key == pygame.K_BACKSPACE: grid[r][c]=0; validation_grid[r][c]=None
-
+                    # Цифры и буквы (A = 10 ...), см. CELL_SYMBOLS; Ctrl+буква — команда, не ход
+                    val = 0 if event.mod & pygame.KMOD_CTRL else parse_cell_value(event.unicode, grid_size)
+                    if val: attempt_place_number(r, c, val)
+                    if event.key == pygame.K_BACKSPACE: erase_cell(r, c)
+
+            if game_state == "GAME" and event.type == pygame.KEYDOWN and event.mod & pygame.KMOD_CTRL:
+                if event.key == pygame.K_z: redo_move() if event.mod & pygame.KMOD_SHIFT else undo_move()
+                elif event.key == pygame.K_y: redo_move()
+
+            if game_state == "REPLAY" and (event.type == pygame.MOUSEBUTTONDOWN or event.type == pygame.KEYDOWN):
+                if event.type == pygame.KEYDOWN and event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS): set_replay_speed(2)
+                elif event.type == pygame.KEYDOWN and event.key in (pygame.K_MINUS, pygame.K_KP_MINUS): set_replay_speed(0.5)
+                else: stop_replay()
+
+        if profiler.enabled: profiler.mark("events")
+        if game_state == "LOADING": poll_pending_game()
+        if hint_job and game_state == "GAME": poll_hint()
+        autosave_tick()
+        dirty = None
         if game_state == "SPLASH": draw_splash_screen()
         elif game_state == "MAIN_MENU": draw_main_menu()
         elif game_state == "MODE_SELECT": draw_mode_select()
         elif game_state == "SETTINGS": draw_settings()
-        elif game_state == "GAME": draw_game_screen()
+        elif game_state == "LOADING": draw_loading_screen()
+        elif game_state == "GAME": dirty = draw_game_screen()
+        elif game_state == "REPLAY": update_replay(); dirty = draw_game_screen()
         elif game_state == "PAUSE": 
             draw_game_screen() 
             draw_pause_menu()
         elif game_state in ["GAME_OVER", "VICTORY_SCREEN"]: draw_overlay("GAME OVER", "No lives left!") if game_state == "GAME_OVER" else draw_overlay("VICTORY!", f"Score: {score}")
         
-        pygame.display.flip()
-        clock.tick(30)
-    pygame.quit(); sys.exit()
+        if profiler.enabled: profiler.mark("update+draw"); dirty = draw_profiler_overlay(dirty); profiler.mark("profiler overlay")
+        # Игровой экран отдаёт только изменившиеся области; остальные экраны и оверлеи — полный flip
+        if dirty is None: game_layers.screen_valid = False; pygame.display.flip()
+        elif dirty: pygame.display.update(dirty)
+        if profiler.enabled: profiler.mark("display update"); profiler.end_frame()
+    quit_game()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,512 @@
+import random
+from functools import lru_cache
+
+from board import Board
+
+# Геометрия режимов: (размер, ширина блока, высота блока)
+MODE_GEOMETRY = {"6x6": (6, 3, 2), "9x9": (9, 3, 3), "16x16": (16, 4, 4), "25x25": (25, 5, 5), "36x36": (36, 6, 6)}
+
+# Режимы и сложности (id, название, [(сложность, доля заполненных клеток)])
+MODES_CONFIG = [
+    ("6x6", "Mini", [("Easy", 0.65), ("Norm", 0.55), ("Adv", 0.48), ("Hard", 0.40), ("Exp", 0.33)]),
+    ("9x9", "Classic", [("Easy", 0.52), ("Norm", 0.32), ("Adv", 0.30), ("Hard", 0.28), ("Exp", 0.22)]),
+    ("16x16", "Monster", [("Easy", 0.60), ("Norm", 0.50), ("Adv", 0.45), ("Hard", 0.42), ("Exp", 0.39)]),
+    ("25x25", "Giant", [("Easy", 0.68), ("Norm", 0.64), ("Adv", 0.60), ("Hard", 0.57), ("Exp", 0.55)]),
+    ("36x36", "Titan", [("Easy", 0.72), ("Norm", 0.68), ("Adv", 0.65), ("Hard", 0.62), ("Exp", 0.60)])
+]
+
+
+def difficulty_fill(mode, difficulty):
+    # "Hard" -> 0.28 для 9x9; число (или строка с числом) возвращается как есть
+    for m_id, _, diffs in MODES_CONFIG:
+        if m_id == mode:
+            for d_name, d_val in diffs:
+                if d_name.lower() == str(difficulty).lower(): return d_val
+    return float(difficulty)
+
+
+# Символы цифр 1..36: после 9 идут буквы, 36-я — "0" (как в алфавите 0-9A-Z)
+CELL_SYMBOLS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ0"
+
+def fill_range(mode):
+    # (наименьшая, наибольшая) доля подсказок режима в MODES_CONFIG — за её пределами генератор не настроен
+    for m_id, _, diffs in MODES_CONFIG:
+        if m_id == mode: return min(d for _, d in diffs), max(d for _, d in diffs)
+    raise ValueError(f"unknown mode: {mode}")
+
+
+def format_cell_value(val): return CELL_SYMBOLS[val - 1]
+
+def parse_cell_value(ch, size):
+    # Клавиша -> цифра (0, если такой на доске этого размера нет); "0" — цифра только на 36x36
+    v = CELL_SYMBOLS.find(ch.upper()) + 1 if ch else 0
+    return v if 0 < v <= size else 0
+
+
+def is_valid_logic(board, row, col, num, size, bw, bh):
+    for x in range(size):
+        if board[row][x] == num: return False
+    for x in range(size):
+        if board[x][col] == num: return False
+    sr, sc = row - row % bh, col - col % bw
+    for i in range(bh):
+        for j in range(bw):
+            if board[i + sr][j + sc] == num: return False
+    return True
+
+
+# --- ОЧКИ ---
+FAST_PLACEMENT_S = 5.0
+
+def placement_points(hinted, had_error, seconds_since_select):
+    # Верный ход: 100, x1.5 если поставлен быстрее FAST_PLACEMENT_S после выбора клетки, x0.5 после ошибки в клетке
+    if hinted: return 0
+    points = 100
+    if seconds_since_select < FAST_PLACEMENT_S: points = int(points * 1.5)
+    if had_error: points = int(points * 0.5)
+    return points
+
+def time_bonus(score, time_ms):
+    mins = time_ms // 60000
+    mult = 0.5 if mins < 2 else (0.3 if mins < 5 else (0.1 if mins < 10 else 0.0))
+    return int(score * mult)
+
+
+# --- CONSTRAINT ENGINE ---
+# Битовые маски занятости строк, столбцов и блоков: бит d установлен, если цифра d уже стоит в группе.
+# Счётчики нужны потому, что игрок может поставить повторяющуюся (ошибочную) цифру.
+
+class Constraints:
+    def __init__(self, board, size, bw, bh):
+        self.board = board
+        self.size, self.bw, self.bh = size, bw, bh
+        self.boxes_per_row = size // bw
+        self.full_mask = ((1 << size) - 1) << 1
+        self.rows = [0] * size; self.cols = [0] * size; self.boxes = [0] * size
+        self.counts = [[0] * (size + 1) for _ in range(size * 3)]
+        for r, row in enumerate(board):
+            for c, v in enumerate(row):
+                if v: self._add(r, c, v)
+
+    def box_index(self, r, c): return (r // self.bh) * self.boxes_per_row + c // self.bw
+
+    def _add(self, r, c, num):
+        b = self.box_index(r, c); bit = 1 << num; n = self.size
+        self.counts[r][num] += 1; self.counts[n + c][num] += 1; self.counts[2 * n + b][num] += 1
+        self.rows[r] |= bit; self.cols[c] |= bit; self.boxes[b] |= bit
+
+    def _remove(self, r, c, num):
+        b = self.box_index(r, c); bit = ~(1 << num); n = self.size
+        self.counts[r][num] -= 1; self.counts[n + c][num] -= 1; self.counts[2 * n + b][num] -= 1
+        if not self.counts[r][num]: self.rows[r] &= bit
+        if not self.counts[n + c][num]: self.cols[c] &= bit
+        if not self.counts[2 * n + b][num]: self.boxes[b] &= bit
+
+    def set(self, r, c, num):
+        old = self.board[r][c]
+        if old == num: return
+        if old: self._remove(r, c, old)
+        self.board[r][c] = num
+        if num: self._add(r, c, num)
+
+    def used_mask(self, r, c):
+        return self.rows[r] | self.cols[c] | self.boxes[self.box_index(r, c)]
+
+    def is_valid(self, r, c, num): return not self.used_mask(r, c) & (1 << num)
+
+    def candidate_mask(self, r, c): return self.full_mask & ~self.used_mask(r, c)
+
+    def candidates(self, r, c): return mask_to_digits(self.candidate_mask(r, c))
+
+
+class BoardState(Constraints):
+    # Доска игрока: к маскам Constraints добавлены счётчики, которые интерфейс спрашивает каждый кадр —
+    # заполненные клетки, сколько раз стоит каждая цифра, сколько клеток совпадает с решением
+    # и список пустых клеток (с позициями, чтобы удалять из него за O(1))
+    def __init__(self, board, size, bw, bh, solution=None):
+        super().__init__(board, size, bw, bh)
+        self.solution = solution
+        self.filled = self.correct = 0
+        self.digit_counts = [0] * (size + 1)
+        self.empty_cells = []; self.empty_pos = {}
+        for r, row in enumerate(board):
+            for c, v in enumerate(row):
+                if v: self._count(r, c, v, 1)
+                else: self._push_empty(r, c)
+
+    def _count(self, r, c, num, d):
+        self.filled += d; self.digit_counts[num] += d
+        if self.solution and self.solution[r][c] == num: self.correct += d
+
+    def _push_empty(self, r, c):
+        self.empty_pos[(r, c)] = len(self.empty_cells); self.empty_cells.append((r, c))
+
+    def _pop_empty(self, r, c):
+        i = self.empty_pos.pop((r, c)); last = self.empty_cells.pop()
+        if last != (r, c): self.empty_cells[i] = last; self.empty_pos[last] = i
+
+    def set(self, r, c, num):
+        old = self.board[r][c]
+        if old == num: return
+        if old: self._count(r, c, old, -1)
+        else: self._pop_empty(r, c)
+        super().set(r, c, num)
+        if num: self._count(r, c, num, 1)
+        else: self._push_empty(r, c)
+
+    def remaining(self, num): return self.size - self.digit_counts[num]
+
+    def is_solved(self): return self.correct == self.size * self.size
+
+
+def mask_to_digits(mask):
+    out = []
+    while mask:
+        low = mask & -mask
+        out.append(low.bit_length() - 1)
+        mask ^= low
+    return out
+
+
+# --- SOLVERS ---
+def solve_backtrack(board, size, bw, bh, rng=None, cons=None, start=0, stats=None):
+    # Старый решатель: обход по строкам, цифры в случайном порядке.
+    # stats (dict) — для профилирования: nodes (поставленных цифр) и backtracks (снятых)
+    rng = rng or random
+    if cons is None: cons = Constraints(board, size, bw, bh)
+    for pos in range(start, size * size):
+        i, j = divmod(pos, size)
+        if board[i][j] == 0:
+            nums = cons.candidates(i, j); rng.shuffle(nums)
+            for num in nums:
+                cons.set(i, j, num)
+                if solve_backtrack(board, size, bw, bh, rng, cons, pos + 1, stats):
+                    if stats is not None: stats["nodes"] = stats.get("nodes", 0) + 1
+                    return True
+                cons.set(i, j, 0)
+                if stats is not None:
+                    stats["nodes"] = stats.get("nodes", 0) + 1; stats["backtracks"] = stats.get("backtracks", 0) + 1
+            return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def _dlx_template(size, bw, bh):
+    # Точное покрытие: 4*n*n столбцов (клетка, строка-цифра, столбец-цифра, блок-цифра), n^3 вариантов.
+    # Узел 0 — корень, 1..ncols — заголовки столбцов, дальше по 4 узла на вариант (r, c, d).
+    n = size; nn = n * n; ncols = 4 * nn
+    boxes_per_row = n // bw
+    L = list(range(-1, ncols)); L[0] = ncols
+    R = list(range(1, ncols + 2)); R[ncols] = 0
+    U = list(range(ncols + 1)); D = list(range(ncols + 1)); C = list(range(ncols + 1))
+    S = [0] * (ncols + 1)
+    first = []
+    for r in range(n):
+        for c in range(n):
+            b = (r // bh) * boxes_per_row + c // bw
+            for d in range(n):
+                cols = (1 + r * n + c, 1 + nn + r * n + d, 1 + 2 * nn + c * n + d, 1 + 3 * nn + b * n + d)
+                start = len(L); first.append(start)
+                for k, col in enumerate(cols):
+                    node = start + k
+                    L.append(start + (k - 1) % 4); R.append(start + (k + 1) % 4)
+                    U.append(U[col]); D.append(col); C.append(col)
+                    D[U[col]] = node; U[col] = node; S[col] += 1
+    return L, R, U, D, C, S, first
+
+
+def _option_of(node, ncols): return (node - ncols - 1) // 4
+
+
+def solve_dlx(board, size, bw, bh, rng=None, randomize=True, limit=1, solutions=None, stats=None):
+    # Алгоритм X на танцующих ссылках, итеративный поиск с эвристикой MRV.
+    # Заполняет board первым найденным решением; возвращает число найденных решений (до limit).
+    # stats (dict) — для профилирования: nodes (выбранных вариантов) и backtracks (их отмен).
+    L, R, U, D, C, S, first = _dlx_template(size, bw, bh)
+    L, R, U, D, S = L[:], R[:], U[:], D[:], S[:]
+    n = size; ncols = 4 * n * n
+    rng = rng or random
+
+    def cover(c):
+        L[R[c]] = L[c]; R[L[c]] = R[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]; D[U[j]] = D[j]; S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(c):
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1; U[D[j]] = j; D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        L[R[c]] = c; R[L[c]] = c
+
+    # Подсказки: сразу покрываем их столбцы
+    covered = [False] * (ncols + 1)
+    for r in range(n):
+        for c in range(n):
+            v = board[r][c]
+            if not v: continue
+            node = first[(r * n + c) * n + v - 1]
+            for k in range(4):
+                if covered[C[node + k]]: return 0
+                covered[C[node + k]] = True; cover(C[node + k])
+
+    found = 0; chosen = []; frames = []
+    nodes = backtracks = 0
+    descend = True
+    while True:
+        if descend:
+            if R[0] == 0:
+                found += 1
+                if found == 1: _write_solution(board, chosen, ncols, n)
+                if solutions is not None: solutions.append([_option_of(x, ncols) for x in chosen])
+                if found >= limit: break
+            else:
+                best, c = ncols + 1, R[0]
+                j = c
+                while j:
+                    if S[j] < best:
+                        best, c = S[j], j
+                        if best <= 1: break
+                    j = R[j]
+                if best:
+                    cover(c)
+                    rows = []; i = D[c]
+                    while i != c: rows.append(i); i = D[i]
+                    if randomize: rng.shuffle(rows)
+                    frames.append([c, rows, -1])
+        if not frames: break
+        f = frames[-1]
+        if f[2] >= 0:
+            r = f[1][f[2]]; chosen.pop(); backtracks += 1
+            j = L[r]
+            while j != r: uncover(C[j]); j = L[j]
+        f[2] += 1
+        if f[2] < len(f[1]):
+            r = f[1][f[2]]; chosen.append(r); nodes += 1
+            j = R[r]
+            while j != r: cover(C[j]); j = R[j]
+            descend = True
+        else:
+            uncover(f[0]); frames.pop(); descend = False
+    if stats is not None:
+        stats["nodes"] = stats.get("nodes", 0) + nodes; stats["backtracks"] = stats.get("backtracks", 0) + backtracks
+    return found
+
+
+def _write_solution(board, chosen, ncols, n):
+    for node in chosen:
+        opt = _option_of(node, ncols)
+        cell, d = divmod(opt, n)
+        r, c = divmod(cell, n)
+        board[r][c] = d + 1
+
+
+SOLVERS = {"dlx": solve_dlx, "backtrack": solve_backtrack}
+DEFAULT_SOLVER = "dlx"
+
+
+# --- UNIQUENESS ---
+@lru_cache(maxsize=None)
+def _units(size, bw, bh):
+    rows = [tuple(r * size + c for c in range(size)) for r in range(size)]
+    cols = [tuple(r * size + c for r in range(size)) for c in range(size)]
+    boxes = [tuple((br + i) * size + bc + j for i in range(bh) for j in range(bw))
+             for br in range(0, size, bh) for bc in range(0, size, bw)]
+    return tuple(rows + cols + boxes)
+
+
+def _propagate(cand, units, full):
+    # Одиночки (naked) и скрытые одиночки (hidden) по всем группам, пока есть изменения.
+    # Возвращает False при противоречии.
+    changed = True
+    while changed:
+        changed = False
+        for unit in units:
+            singles = 0
+            for i in unit:
+                m = cand[i]
+                if not m & (m - 1):
+                    if m & singles: return False
+                    singles |= m
+            once = twice = 0
+            for i in unit:
+                m = cand[i]
+                if m & (m - 1):
+                    m2 = m & ~singles
+                    if m2 != m:
+                        if not m2: return False
+                        cand[i] = m = m2; changed = True
+                twice |= once & m; once |= m
+            if once != full: return False
+            hidden = once & ~twice & ~singles
+            if hidden:
+                for i in unit:
+                    m = cand[i]
+                    h = m & hidden
+                    if h and m & (m - 1):
+                        if h & (h - 1): return False
+                        cand[i] = h; changed = True
+    return True
+
+
+def _candidate_masks(board, size):
+    full = ((1 << size) - 1) << 1
+    return [(1 << v) if v else full for row in board for v in row]
+
+
+def _search(cand, size, bw, bh, limit, node_limit, stats=None):
+    # Поиск в глубину по копиям масок кандидатов с распространением одиночек в каждом узле
+    # и ветвлением по клетке с наименьшим числом кандидатов.
+    # Если перебор превысил node_limit, ответ неизвестен — возвращаем limit (считаем, что решений много).
+    # stats (dict) — для профилирования: nodes (узлов) и backtracks (тупиков), как у решателей
+    n = size; units = _units(size, bw, bh)
+    full = ((1 << n) - 1) << 1
+    stack = [cand]; count = 0; nodes = dead = 0
+    while stack:
+        cand = stack.pop(); nodes += 1
+        if node_limit and nodes > node_limit: count = limit; break
+        if not _propagate(cand, units, full): dead += 1; continue
+        best, best_k = -1, n + 1
+        for i, m in enumerate(cand):
+            if m & (m - 1):
+                k = bin(m).count("1")
+                if k < best_k:
+                    best, best_k = i, k
+                    if k == 2: break
+        if best < 0:
+            count += 1
+            if count >= limit: break
+            continue
+        m = cand[best]
+        while m:
+            bit = m & -m; m ^= bit
+            child = cand[:]; child[best] = bit
+            stack.append(child)
+    if stats is not None:
+        stats["nodes"] = stats.get("nodes", 0) + nodes; stats["backtracks"] = stats.get("backtracks", 0) + dead
+    return count
+
+
+def count_solutions(board, size, bw, bh, limit=2, node_limit=None):
+    # Подсчёт решений с остановкой на limit
+    return _search(_candidate_masks(board, size), size, bw, bh, limit, node_limit)
+
+
+def _stays_unique(board, group, saved, size, bw, bh, node_limit, stats=None):
+    # Доска с подсказками saved в клетках group имела единственное решение, значит любое
+    # другое решение отличается хотя бы в одной из этих клеток: ищем решение с запретом saved в каждой.
+    base = _candidate_masks(board, size)
+    for (i, j), v in zip(group, saved):
+        cand = base[:]; cand[i * size + j] &= ~(1 << v)
+        if _search(cand, size, bw, bh, 1, node_limit, stats): return False
+    return True
+
+
+def has_unique_solution(board, size, bw, bh, node_limit=None): return count_solutions(board, size, bw, bh, 2, node_limit) == 1
+
+
+SYMMETRIES = ("none", "rotational", "mirror", "diagonal", "four-way")
+
+def symmetric_cells(r, c, size, symmetry="none"):
+    n1 = size - 1
+    if symmetry == "rotational": return {(r, c), (n1 - r, n1 - c)}
+    if symmetry == "mirror": return {(r, c), (r, n1 - c)}
+    if symmetry == "diagonal": return {(r, c), (c, r)}
+    if symmetry == "four-way": return {(r, c), (r, n1 - c), (n1 - r, c), (n1 - r, n1 - c)}
+    return {(r, c)}
+
+
+# На досках больше 9x9 полный перебор при проверке делает копание 16x16 десятками секунд,
+# а с бюджетом в несколько узлов подсказок остаётся почти столько же. На больших досках (LARGE_SIZE и
+# больше) даже короткий поиск стоит десятки миллисекунд на клетку — там убираются только цифры,
+# выводимые одиночками (0 — без поиска), поэтому сложности 25x25 и 36x36 держатся выше ~55% подсказок.
+# 16x16 с бюджетом 4 копается примерно до 38% подсказок, и бюджет 200 опускает это лишь до 37% ценой
+# ~10 с на доску — поэтому доли 16x16 в MODES_CONFIG подобраны так, чтобы каждая была достижима.
+LARGE_SIZE = 25
+
+def dig_node_limit(size): return None if size <= 9 else (4 if size < LARGE_SIZE else 0)
+
+
+def _forced(cons, r, c, v):
+    # Цифра v в пустой клетке выводится из оставшихся подсказок одиночкой (naked или hidden) —
+    # тогда единственность сохраняется без перебора
+    bit = 1 << v
+    if cons.candidate_mask(r, c) == bit: return True
+    size, flat = cons.size, cons.board.cells
+    br, bc = r - r % cons.bh, c - c % cons.bw
+    for cells in (((r, k) for k in range(size)), ((k, c) for k in range(size)),
+                  ((br + k // cons.bw, bc + k % cons.bw) for k in range(size))):
+        if not any(not flat[i * size + j] and (i, j) != (r, c) and cons.candidate_mask(i, j) & bit for i, j in cells): return True
+    return False
+
+
+def dig_unique(solution, size, bw, bh, fill_percent, symmetry="none", rng=None, node_limit=None, stats=None):
+    # Убираем подсказки (группами по симметрии), только если решение остаётся единственным.
+    # Группа, без которой решений стало больше одного, нужна и дальше, поэтому каждая проверяется один раз.
+    # Пока подсказок много, почти каждая убранная цифра выводится одиночкой, и поиск не нужен.
+    # stats: dig_forced / dig_searched — групп, проверенных одиночками и перебором, плюс узлы перебора
+    rng = rng or random
+    board = Board.from_rows(solution, bw, bh).copy()
+    cons = Constraints(board, size, bw, bh)
+    keep = int(size * size * fill_percent)
+    filled = size * size
+    order = [(r, c) for r in range(size) for c in range(size)]; rng.shuffle(order)
+    for r, c in order:
+        if filled <= keep: break
+        group = [(i, j) for i, j in symmetric_cells(r, c, size, symmetry) if board[i][j]]
+        if not group: continue
+        saved = [board[i][j] for i, j in group]
+        for i, j in group: cons.set(i, j, 0)
+        forced = all(_forced(cons, i, j, v) for (i, j), v in zip(group, saved))
+        if stats is not None:
+            k = "dig_forced" if forced or node_limit == 0 else "dig_searched"; stats[k] = stats.get(k, 0) + 1
+        if forced or (node_limit != 0 and _stays_unique(board, group, saved, size, bw, bh, node_limit, stats)): filled -= len(group)
+        else:
+            for (i, j), v in zip(group, saved): cons.set(i, j, v)
+    return board
+
+
+# --- GENERATION ---
+# Пустую доску 36x36 поиск заполняет минутами (уходит в глубокие откаты), поэтому решения больших досок
+# строятся из шаблона со сдвигами, перемешанного перестановками, которые сохраняют правила
+def pattern_solution(size, bw, bh, rng=None):
+    rng = rng or random
+    def shuffled_lines(block):
+        groups = list(range(size // block)); rng.shuffle(groups)
+        out = []
+        for g in groups:
+            lines = list(range(g * block, (g + 1) * block)); rng.shuffle(lines); out += lines
+        return out
+    rows, cols = shuffled_lines(bh), shuffled_lines(bw)
+    digits = list(range(1, size + 1)); rng.shuffle(digits)
+    board = [[digits[(bw * (r % bh) + r // bh + c) % size] for c in cols] for r in rows]
+    if bw == bh and rng.random() < 0.5: board = [list(col) for col in zip(*board)]
+    return board
+
+
+def generate_puzzle(size, bw, bh, fill_percent, solver=DEFAULT_SOLVER, rng=None, unique=True, symmetry="none", stats=None):
+    # (головоломка, решение) — обе Board; stats копит счётчики заполнения и копания (см. dig_unique)
+    rng = rng or random
+    if size >= LARGE_SIZE: board = Board.from_rows(pattern_solution(size, bw, bh, rng), bw, bh)
+    else:
+        board = Board(size, bw, bh)
+        SOLVERS[solver](board, size, bw, bh, rng=rng, stats=stats)
+    full_solution = board.copy()
+    if unique:
+        return dig_unique(full_solution, size, bw, bh, fill_percent, symmetry, rng, dig_node_limit(size), stats), full_solution
+    total = size * size
+    keep = int(total * fill_percent)
+    attempts = total - keep
+    while attempts > 0:
+        r, c = rng.randint(0, size - 1), rng.randint(0, size - 1)
+        if board[r][c] != 0: board[r][c] = 0
+        attempts -= 1
+    return board, full_solution
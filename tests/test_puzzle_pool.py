@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from puzzle_pool import PuzzlePool
+
+MENU_KEY = ("6x6", 0.5)
+
+
+def wait_loading(sudoku, timeout=30):
+    end = time.monotonic() + timeout
+    while sudoku.game_state == "LOADING" and time.monotonic() < end:
+        sudoku.poll_pending_game(); time.sleep(0.005)
+    return sudoku.game_state
+
+
+@pytest.fixture
+def pool():
+    p = PuzzlePool([MENU_KEY], workers=1); p.start()
+    yield p
+    p.shutdown()
+
+
+def test_serves_only_menu_keys(pool):
+    assert pool.serves(MENU_KEY)
+    assert not pool.serves(("6x6", 0.37))
+    assert pool.pop(("6x6", 0.37)) is None
+
+
+def test_request_off_menu_fill(pool):
+    key = ("6x6", 0.37)
+    assert pool.request(key, 5)
+    end = time.monotonic() + 30
+    while (item := pool.take(key, 5)) is None and time.monotonic() < end: time.sleep(0.005)
+    assert item is not None and item[0] == 5
+
+
+def test_new_game_after_off_menu_code(pool, tmp_path, monkeypatch):
+    # Код со сложностью не из меню, затем "Try Again": новая партия не должна застревать на экране загрузки
+    pygame = pytest.importorskip("pygame")
+    monkeypatch.setenv("SDL_VIDEODRIVER", "dummy"); monkeypatch.chdir(tmp_path)
+    import sudoku
+    monkeypatch.setattr(sudoku, "puzzle_pool", pool); monkeypatch.setattr(sudoku, "puzzle_bank", None)
+    sudoku.init_ui()
+    try:
+        sudoku.start_code_game("6x6-370-abc-3")
+        assert wait_loading(sudoku) == "GAME" and sudoku.current_seed == 0xabc
+        sudoku.start_new_game()
+        assert wait_loading(sudoku) == "GAME"
+        assert sudoku.difficulty_fill_percent == 0.37 and sudoku.current_seed != 0xabc
+    finally: pygame.quit()